@@ -93,6 +93,72 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Persistent cache for translations / language detection (Main.translation)
+    'translations': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'translations',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# "google" uses googletrans; "local" is the offline stub used in tests.
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'google')
+
+# Prediction result cache (Main.TrainingModel.result_cache). Set
+# PREDICTION_CACHE_ALIAS to a CACHES alias backed by memcached/redis to share
+# results between worker processes.
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '3600'))
+PREDICTION_CACHE_ALIAS = os.getenv('PREDICTION_CACHE_ALIAS', '')
+
+# Known-story lookup (Main.known_stories): a check whose text is at least
+# KNOWN_STORY_MIN_SIMILARITY similar to one of the top KNOWN_STORY_CANDIDATES
+# full-text matches returns that story's stored label without the models.
+# The match requires the KNOWN_STORY_QUERY_TERMS longest words of the text and
+# ranks at most KNOWN_STORY_MAX_MATCHES rows.
+KNOWN_STORY_LOOKUP = os.getenv('KNOWN_STORY_LOOKUP', '1') == '1'
+KNOWN_STORY_CANDIDATES = int(os.getenv('KNOWN_STORY_CANDIDATES', '5'))
+KNOWN_STORY_QUERY_TERMS = int(os.getenv('KNOWN_STORY_QUERY_TERMS', '8'))
+KNOWN_STORY_MAX_MATCHES = int(os.getenv('KNOWN_STORY_MAX_MATCHES', '200'))
+KNOWN_STORY_MIN_SIMILARITY = float(os.getenv('KNOWN_STORY_MIN_SIMILARITY', '0.9'))
+
+# Inference service (Main.inference_service). With INFERENCE_SERVICE_SOCKET set,
+# web workers send checks to `manage.py run_inference_service` instead of
+# loading the models themselves.
+INFERENCE_SERVICE_SOCKET = os.getenv('INFERENCE_SERVICE_SOCKET', '')
+INFERENCE_SERVICE_TIMEOUT = float(os.getenv('INFERENCE_SERVICE_TIMEOUT', '10'))
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '2'))
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', '32'))
+INFERENCE_BATCH_WAIT_MS = float(os.getenv('INFERENCE_BATCH_WAIT_MS', '5'))
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '256'))
+# Threads that run the in-process models for the async views.
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '2'))
+
+# Batch endpoint for the extension (search_for_extension_batch).
+BATCH_CHECK_MAX_ITEMS = int(os.getenv('BATCH_CHECK_MAX_ITEMS', '100'))
+BATCH_CHECK_MAX_CHARS = int(os.getenv('BATCH_CHECK_MAX_CHARS', '20000'))
+BATCH_CHECK_MAX_BYTES = int(os.getenv('BATCH_CHECK_MAX_BYTES', str(2 * 1024 * 1024)))
+BATCH_CHECK_CHUNK = int(os.getenv('BATCH_CHECK_CHUNK', '16'))
+
+# Batched UserQueryLog writer (Main.querylog). QUERY_LOG_OVERFLOW is "drop"
+# or "block" (wait up to QUERY_LOG_BLOCK_SECONDS for room in the queue; async
+# views always drop instead of blocking the event loop).
+QUERY_LOG_BATCH_SIZE = int(os.getenv('QUERY_LOG_BATCH_SIZE', '100'))
+QUERY_LOG_FLUSH_MS = int(os.getenv('QUERY_LOG_FLUSH_MS', '500'))
+QUERY_LOG_MAX_PENDING = int(os.getenv('QUERY_LOG_MAX_PENDING', '10000'))
+QUERY_LOG_OVERFLOW = os.getenv('QUERY_LOG_OVERFLOW', 'drop')
+QUERY_LOG_BLOCK_SECONDS = float(os.getenv('QUERY_LOG_BLOCK_SECONDS', '0.05'))
+
+# Daily scrape-and-retrain job (Main.scheduler). Set SCRAPER_RUN_IN_WEB=0 when
+# `manage.py run_daily_scrape --loop` runs as a separate worker.
+SCRAPER_RUN_IN_WEB = os.getenv('SCRAPER_RUN_IN_WEB', '1') == '1'
+SCRAPER_LOCK_FILE = BASE_DIR / 'cache' / 'daily_scrape.lock'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -1,28 +1,36 @@
-import pickle
 from Main.TrainingModel.Prediction import Prediction
-import pandas as pd
-import torch,os
-import pandas as pd
+from Main.TrainingModel.registry import registry
+from Main.TrainingModel.result_cache import fingerprint, get_result_cache
+
+
 class AuthenticityChecker:
     def __init__(self) -> None:
-        print(os.path.dirname(__file__) + '\\GB.pkl',Prediction)
-        with open(os.path.dirname(__file__) + '\\PT.pkl', 'rb') as f:
-            pt = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\RF.pkl', 'rb') as f:
-            RF = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\GB.pkl', 'rb') as f:
-            GB = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\LR.pkl', 'rb') as f:
-            LR = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\OC.pkl', 'rb') as f:
-            OC = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\vect.pkl', 'rb') as f:
-            vect = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\vocab.pkl', 'rb') as f:
-            vocab = pickle.load(f)
+        # Models are loaded once per process by the registry; this only picks
+        # up the current generation so a check runs against a consistent set.
+        self.bundle = registry.current()
+        self.pp = self.bundle.predictor
 
-        self.pp = Prediction(OC, LR, GB, RF,pt, vect, vocab)
     def check(self, text):
-        self.pp.predict(text)
-        return self.pp.get_percent()
-    
+        normalized = self.pp.normalize(text)
+        key = fingerprint(normalized, self.bundle.generation)
+        cache = get_result_cache()
+        score = cache.get(key, self.bundle.generation)
+        if score is None:
+            score = Prediction.to_percent(self.pp.predict(normalized, normalized=True))
+            cache.set(key, self.bundle.generation, score)
+        return score
+
+    def check_many(self, texts):
+        """check() for a batch: cached scores are reused and all misses go
+        through one predict_many() call."""
+        normalized = [self.pp.normalize(text) for text in texts]
+        keys = [fingerprint(text, self.bundle.generation) for text in normalized]
+        cache = get_result_cache()
+        scores = [cache.get(key, self.bundle.generation) for key in keys]
+        misses = [i for i, score in enumerate(scores) if score is None]
+        if misses:
+            predicted = self.pp.predict_many([normalized[i] for i in misses], normalized=True)
+            for i, score in zip(misses, predicted):
+                scores[i] = score
+                cache.set(keys[i], self.bundle.generation, score)
+        return scores
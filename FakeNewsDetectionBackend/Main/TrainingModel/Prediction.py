@@ -1,15 +1,35 @@
-import re
-import scipy
 import pandas as pd
 import torch
-import re,os
+import re,os,random,time
 from nltk.tokenize import RegexpTokenizer
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-import pickle
-from torch.utils.data import DataLoader, TensorDataset
 import torch.nn as nn
-import torch.optim as optim
+from typing import Optional
+
+from .stemmer import default_stemmer
+from .normalizer import clean_devanagari, remove_characters, shared_analysis, tokenize_document
+from .inference import lstm_scores
+from .ensemble import PARALLEL, fit_members, timed
+from .feature_cache import fit_transform_tokens, transform_tokens
+from .vocab import VocabIndex, pad_batch
+
+# LSTM input windowing. Packed models see at most LSTM_WINDOW tokens per
+# window; with LSTM_SLIDING_WINDOW=1 long articles are cut into windows every
+# LSTM_STRIDE tokens and the window scores are combined with LSTM_AGGREGATE
+# (mean, min or max) instead of dropping everything past the first window.
+LSTM_WINDOW = int(os.getenv("LSTM_WINDOW", "100"))
+LSTM_STRIDE = int(os.getenv("LSTM_STRIDE", str(LSTM_WINDOW)))
+LSTM_SLIDING_WINDOW = os.getenv("LSTM_SLIDING_WINDOW", "0") == "1"
+LSTM_AGGREGATE = os.getenv("LSTM_AGGREGATE", "mean")
+
+# Overrides RandomForest's n_jobs for full fits (e.g. -1 for all cores).
+RF_JOBS = int(os.getenv("TRAINING_RF_JOBS", "0")) or None
+
+AGGREGATES = {
+    "mean": lambda scores: sum(scores) / len(scores),
+    "min": min,
+    "max": max,
+}
 
 class FakeNewsLSTM(nn.Module):
     def __init__(self, vocab_size, embedding_dim, hidden_dim, output_dim, n_layers, bidirectional, dropout):
@@ -27,14 +47,48 @@ class FakeNewsLSTM(nn.Module):
         self.dropout = nn.Dropout(dropout)
         self.sigmoid = nn.Sigmoid()
         
-    def forward(self, x):
+    def forward(self, x, lengths: Optional[torch.Tensor] = None):
         embedded = self.dropout(self.embedding(x))
-        lstm_out, (hidden, cell) = self.lstm(embedded)
+        if lengths is None:
+            lstm_out, (hidden, cell) = self.lstm(embedded)
+        else:
+            # Packed input: the LSTM stops at each row's real length, so the
+            # final hidden state is not computed over trailing <PAD> tokens.
+            packed = nn.utils.rnn.pack_padded_sequence(embedded, lengths.cpu(), batch_first=True, enforce_sorted=False)
+            lstm_out, (hidden, cell) = self.lstm(packed)
         hidden = self.dropout(torch.cat((hidden[-2,:,:], hidden[-1,:,:]), dim=1)) if self.lstm.bidirectional else hidden[-1,:,:]
         output = self.fc(hidden)
         return self.sigmoid(output)
 
-    
+
+
+class BucketBatchSampler:
+    """Batches of indices with similar lengths, so padding per batch stays small."""
+
+    def __init__(self, lengths, batch_size, shuffle=True):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+
+    def __iter__(self):
+        if self.shuffle:
+            order = sorted(range(len(self.lengths)), key=lambda i: (self.lengths[i], random.random()))
+        else:
+            order = sorted(range(len(self.lengths)), key=self.lengths.__getitem__)
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+        if self.shuffle:
+            random.shuffle(batches)
+        return iter(batches)
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+
+def collate_packed(batch):
+    sequences, labels = zip(*batch)
+    ids, lengths = pad_batch(list(sequences))
+    return ids, lengths, torch.tensor(labels)
+
 
 class Prediction:
     def __init__(self,OC=False, LR=False, GB=False, RF=False, pt=False,vect=False,vocab=False):
@@ -46,28 +100,15 @@ class Prediction:
         self.vect = vect
 
         self.vocab = vocab
-        print(self.vocab)
-        self.suf = []
-        self.words = [ ]
-        
-        with open(os.path.dirname(__file__) + "\\suf.txt", "r", encoding="utf-8-sig") as s:
-            for t in s.read().split("\n"):
-                self.suf.append(t)
-        
-        
-        with open(os.path.dirname(__file__) + "\\dict.txt", "r", encoding="utf-8-sig") as s:
-            for t in s.read().split("\n"):
-                self.words.append(t)
+        # Filled in by fit()/fit_incremental() and stored with the artifacts.
+        self.training_metrics = {}
+        self.training_report = {}
+        # dict.txt/suf.txt are parsed once per process and shared.
+        self.stemmer = default_stemmer()
+        self.suf = self.stemmer.suffixes
+        self.words = self.stemmer.words
     def clean_text_(self,text):
-        text = re.sub(r'[^\u0900-\u097F\s]', '', text)  
-        text = re.sub(r'\s+', ' ', text).strip() 
-        puncts = r"$&+,:;=?@#|'<>.^*()%!-।"
-        if text in list(puncts):
-            return text
-        else:
-            text = re.sub(r"[$&+।।,:;=?@#|'<>.^*()%!-]","", text)
-
-        return text
+        return clean_devanagari(text)
     tokenizer = RegexpTokenizer(r'[\u0900-\u097F]+') 
 
     def build_vocab(self,tokenized_texts, max_vocab_size=10000):
@@ -78,51 +119,54 @@ class Prediction:
         vocab["<UNK>"] = 1  
         return vocab
 
+    def vocab_index(self, vocab=None):
+        vocab = self.vocab if vocab is None else vocab
+        index = getattr(self, "_vocab_index", None)
+        if index is None or index.vocab is not vocab:
+            index = self._vocab_index = VocabIndex(vocab)
+        return index
+
     def text_to_sequence(self,tokens, vocab):
-        return [vocab.get(token, vocab["<UNK>"]) for token in tokens]
+        return self.vocab_index(vocab).encode(tokens)
+
+    def texts_to_sequences(self, tokenized_texts, vocab=None):
+        """text_to_sequence() for many token lists: int64 views into one
+        buffer, encoded in a single pass."""
+        return self.vocab_index(vocab).encode_many(tokenized_texts)
 
     def preprocess_data(self,df, vocab):
-        tokenized_texts = []
-        for text in df['text']:
-            cleaned_text = self.clean_text_(text)
-            tokens = self.tokenizer.tokenize(cleaned_text)
-            tokenized_texts.append(tokens)
-        
-        sequences = [self.text_to_sequence(tokens, vocab) for tokens in tokenized_texts]
-        
-        return sequences
+        return self.preprocess_texts(df['text'], vocab)
+
+    def tokenize(self, text):
+        return self.tokenizer.tokenize(self.clean_text_(text))
+
+    def analyze_text(self, text):
+        """(TF-IDF terms, LSTM tokens) of a normalized text. With the
+        default vectorizer analyzer both come from one pass over the words
+        (normalizer.tokenize_document); otherwise each branch tokenizes on
+        its own."""
+        if shared_analysis(self.vect):
+            return tokenize_document(text)
+        return self.vect.build_analyzer()(text), self.tokenize(text)
+
+    def analyze(self, texts):
+        """analyze_text() over ``texts``: (term lists, token lists)."""
+        if shared_analysis(self.vect):
+            pairs = [tokenize_document(text) for text in texts]
+        else:
+            analyzer = self.vect.build_analyzer()
+            pairs = [(analyzer(text), self.tokenize(text)) for text in texts]
+        return [terms for terms, _ in pairs], [tokens for _, tokens in pairs]
+
+    def preprocess_texts(self,texts, vocab):
+        tokenized_texts = [self.tokenize(text) for text in texts]
+        return self.texts_to_sequences(tokenized_texts, vocab)
 
 
     def removeCharacters(self,s):
-        tmp = s
-            
-        tmp = re.sub(r"[\x00\x01\x10\x15\x16\x1a\x1e\x02\x03\x05\x06\x07\x08\x17\x1f\x7f\x81\x82\x83\x84\x85\x86\x88\x8d\x8f\x92\x93\x94\x95\x96\x9d\x9e\xa0\xad\uf047\uf0a8\u09b1\uf0af\uf106\u2003\u206e\u206f\u2002\u2009\u200a\u200b\u200c\u200d\u200e\u200f\u2028\u2029\u202a\u202c\u202d\u202f\u2060\u3000\ue86c\uf000\uf001\uf002\uf020\uf026\uf02a\uf02d\uf02f\uf034\uf038\uf03a\uf03c\uf03d\uf03f\uf040\uf046\uf061\uf065\uf06c\uf06d\uf06e\uf071\uf072\uf074\uf075\uf076\uf077\uf07d\uf085\uf096\uf0a2\uf0a7\uf0ab\uf0b6\uf0b7\uf0d8\uf0da\uf0dc\uf0e0\uf0fc\uf164\uf16a\uf339\uf3c6\uf449\uf44c\uf468\uf495\uf4fd\uf527\uf602\uf60a\uf62d\uf64f\uf8ea\uf8ff\ufeff\u0604\U00100000\U00100001\U001000a5\U001000f2\U0010012e\U001001d1\U001001d3\U00100223\U0010024d\u2063\u09b1]+","", ##removing unparsed unicode char sequence
-                    re.sub(r"[a-zA-Zａ-ｚＡ-Ｚ\u00C0-\u024F\u1E00-\u1EFF]+","", # Supposed to be Accented Alphabets
-                    re.sub(r'[一-龠ぁ-ゔァ-ヴー々〆〤ヶアガシズタニネメルー下中亚亞人來公共区區古司吐吴和哔哩国國圳塞多客宮家山岡战戰文日春有木本朴村来民沙深相秋站粵織華蕃藏西言話語语贛載遥限音飯馬马鮨가공구국다대러민바박상서선스어울유의인재조주축팀표플한화ㄩㅎ㎡꞊ꣳ각간감강같개거건걸것게겠겨견경계고과관광교궁권귀그극근글금급기김까껴꼭나난남납내너넉넓네넥녀년노느는늘능니닝단담답당더도동되된됩두드들등디때떨띠라람랍래랩런럼럽레력로록론료를름릎리릭립마만말맛맞매맺멋메멘며면명모목무문물미및발방배번법베변별보복볼봉부분브비뿐사살생샵섯성세셔소송수쉬습시식신실십싸써아안않앙액양언업없었에여역연열영오와외요용우운워원월웠위육으은을음이일임입있자작잘잠장저적전점정제져존종좋준줍줏중즈즣지직진집징짠짱째차착찬참찾책천첫청체초최추출치카컬켓코크큰클키킹타탁터템토톤통트특튼티판팬페편평포프피필핏하학할함합항해햇행향허현혜호홈확환활황회후휴️ﹾ！，：？｜～ｪｫﾥﾧﾪ]+', "", ## Supposed to be Korean
-                    re.sub(r'[~¡£¤¥¦§¨©ª«¬®¯±²µ¶¹º»¼½¾৷੯ੰ–—―†‡•…‰‹›⁄₪€₱₹℅™⅓←→∈∉∑−∕∙√∛≈≠≡≤⋅┐├┬╕╖╗╛╡╢╣╦▇░▓■▪●⧼⧽（）‣￼�☺☼✊✋✌✍✏✓✔✴❆❤♫🇳🇵🌴🌷🌹🌺🌻🌽🌾🌿🎁🎤🎹🎼🏡🏼🏿🐍🐒👁👈👉👍👤👧👨👱💀💃💌💐💓💔💕💘💥💦💿📻🔥🔱🕸🖕😀😂😃😅😆😈😉😊😍😒😔😘😛😝😠😡😢😥😦😭🙁🙂🙈🙉🙊🙋🙏🚩🚫🤔🤣󠆶]+',"",  ## Symbols
-                           tmp))))
-                            
-        tmp = re.sub(r'[¿ÀÁÅÇÈÍÏÓÖ×ØÙÛÜÝÞàáâãäåæçèéêëìíîïðñòóôõö÷øùúüýĀāăćČčĐđĕėğĩīıłňŋŌōŏŒœřŚśŠšũūůųŸŹŽƒǎǧɑɒɔəɛɡɪɾʃʉʊʌʒʔḗṳạảẹẻẽếễệỉịọỏồụủἀἐἱἷᾶῥⲁⲏⲓⲕⲣ]+',"",
-                    re.sub(r'[ʾˆˈˌːˑΐΕΣάέίαβγδεζηθικλμνξοπρςσυφωόύϩЄІАБВГЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдежзийклмнопрстуфхцчшъыьэюяёїҚқҡҧүҷӣԫՀաեյնր]+',"",
-                           re.sub(r'[ִאבדוילןעפקרשת،ؒ؛؟ءآإئابةتثجحخدذرزسشصضطظعغفقكلمنهوىئًَُِّْ٪٫٬ٰٹپچڈډڑژښکڬگڵںھہۆیێېےۓﮐﺗﺠﻪﻫﻮ۔ۛ۰۱۲۳۴۵۶۷۸۹ܐܒܗܝܡܢܪܬހބވދސަިެް]+',"",
-                           tmp)))
-        
-        tmp = re.sub(r'[অআইউঋএঐওকখগঘঙচছজঝঞটঠডঢণতথদধনপফবভমযরলশষসহ়ািীুূেৈো্ৰৱ৳ਅਆਇਈਉਊਏਐਓਔਕਖਗਘਙਚਛਜਝਞਟਠਡਢਣਤਥਦਧਨਪਫਬਭਮਯਰਲਵਸਹ਼ਾਿੀੁੂੇੈੋੌ੍ੜ੦੧੨੩੪੫੬੭੮કગજઞતદનફમરષસાિીુેો્ଆଓଡ଼ିஅஇகஙசஜடதநனபமயரறலளழவஸாிீுூேைொ்అగతథనపమరలశహాిుూెొ్ಕಡನ್ംഅജഞപബമയരലളാിുോ്ංකනලසහිกขคงชญตทธนบปฟมยรลวศษสหอะัาำิีุเใไ่้์ຊດຕທນປລວສະັາິົໄ་།ཀཁགངཅཆཇཉཊཋཌཎཏཐདནཔཕབམཙཚཛཝཞཟའཡརལཤཥསཧཨིེོུྐྒྣྩྫྱྲྵྷစညတနပမရာုေံ္်ြაგთილმრუქማርኛአខភមរសាែ្ᤀᵻऽઅઇએઓચછઝપબયલવશહૌெంణಗಣಬರಳವಶೆೊഇഎഏഐഒകഖഗഘങചടഡണതഥദധനഫഭറഴവശഷസഹീൂെേൈൊൻർൽൾจฉซฒณดถผพภึืูแโๆ็๊๛ພ༺༻ྟྤྴဗბდევზკნოპსტფღყშჩცძწჭხჯჰᎦᎩᎯᎳᏂᏍᏣᏬᖳកគងចជញដណតថទធនបផពយលវហឡអឬឯឲិីឹុូួើៀេៃោៅំះៈ៉៊់៌៏័។៕១៥៨]+',"",
-                           tmp)
-        
-        tmp = re.sub(r"[°³´·¸ɐɕɖɣɦɨɫɯɳɴʁʈʋʏʑʰʲʽˊˋ˗˘˚˜˝̵̷̡̧̞̩̪̭̯͈͙́̃̊̎̒̓ͧͬ̚͡ΑΒΔΖΗΘΙΚΛΜΝΟΠΡΤΥΦΧΩήτώДщєіјҫҳҶөӯԨստְֲֵַָֹֽ׀ׁׂהזחטךכםמנסץצؘؔأؤـٻڌڪ۩۾߮߰ऄ※₋℃№↑↩⇄⇒⇨∇∏∘∞⊕⊗⋲⎼④⑸─│┌╘►▼◄◊◌◎★☆☎☑☺☻♂♠♢♣♥♦♪⚠⛭✉❶❷❸❹❺➧⟲⟳⦁⭕、。《》「」『』【】🆚🇧🇬]+","",tmp)
-        
-        tmp = re.sub(r"[ \t]+"," ",tmp).strip()
-        """
-        query = tmp
-        querywords = query.split()
-    
-        resultwords  = [word for word in querywords if word.lower() not in stopwords]
-        tmp = ' '.join(resultwords)
-        """
-        s = tmp
-            
-        return s
+        # One translate() pass over a precomputed codepoint table; see
+        # normalizer.py for the character classes it removes.
+        return remove_characters(s)
 
     def clean_text(self, text, chars=None):
         puncts = r"$&+,:;=?@#|'<>.^*()%!-"
@@ -143,36 +187,61 @@ class Prediction:
         
         return w
     def pad_sequences(self,sequences, max_length):
-        padded = []
-        for seq in sequences:
-            if len(seq) > max_length:
-                padded.append(seq[:max_length])
-            else:
-                padded.append(seq + [0] * (max_length - len(seq)))  
-        return padded   
+        return pad_batch(sequences, width=max_length)[0].numpy()
 
-    def stem(self,text):
-        if text in self.suf:
-            return text
+    def lstm_windows(self, seq):
+        if not LSTM_SLIDING_WINDOW or len(seq) <= LSTM_WINDOW:
+            return [seq[:LSTM_WINDOW]]
+        last_start = max(len(seq) - LSTM_WINDOW, 0)
+        starts = list(range(0, last_start + 1, LSTM_STRIDE))
+        if starts[-1] != last_start:
+            starts.append(last_start)
+        return [seq[start:start + LSTM_WINDOW] for start in starts]
 
-        w = []
-        for t in text.split(" "):
-            if t not in self.words:
-                pattern = r'(\s*)(' + '|'.join(map(re.escape, self.suf)) + r')$'
-                modified_text = re.sub(pattern, r' \2', t)
-                if len(modified_text.split(" "))>1:
-                    modified_text = self.stem(modified_text.split(" ")[0]) + " " + modified_text.split(" ")[1]
-                w.append(modified_text)
+    def score_sequences(self, sequences, batch_size=64):
+        """LSTM score per token-id sequence.
+
+        Models trained with packing (``pt.packed``) run on length-bucketed
+        batches padded only to the longest window in the bucket; older models
+        keep the fixed 100-token padding they were trained on.
+        """
+        packed = getattr(self.pt, "packed", False)
+        windows, owners = [], []
+        for doc, seq in enumerate(sequences):
+            for window in self.lstm_windows(seq):
+                windows.append(window)
+                owners.append(doc)
+
+        window_scores = [0.0] * len(windows)
+        sampler = BucketBatchSampler([len(w) for w in windows], batch_size, shuffle=False)
+        for batch in sampler:
+            chunk = [windows[i] for i in batch]
+            if packed:
+                ip, lengths = pad_batch(chunk)
+                out = lstm_scores(self.pt, ip, lengths)
             else:
-                w.append(t)
-            
-        modified_text = " ".join(w)
-        
-        return modified_text
+                ip, _ = pad_batch(chunk, width=100)
+                out = lstm_scores(self.pt, ip)
+            for i, score in zip(batch, out.squeeze(1).tolist()):
+                window_scores[i] = score
+
+        per_doc = [[] for _ in sequences]
+        for doc, score in zip(owners, window_scores):
+            per_doc[doc].append(score)
+        aggregate = AGGREGATES[LSTM_AGGREGATE]
+        return [aggregate(scores) for scores in per_doc]
+
+    def stem(self,text):
+        return self.stemmer.stem(text)
     def get_percent(self):
         t = self.p[0] + self.ms[0] + self.ns[0] + self.o[0] + self.op[0]
         t = t[0]
         return float(f'{t/5*100:.4f}')
+    @staticmethod
+    def to_percent(scores):
+        # Same as get_percent, but from the list returned by predict() so a
+        # shared Prediction can be used from several threads at once.
+        return float(f'{sum(scores)/5*100:.4f}')
     def getPurified(self,text):
         text = self.clean_text_(text)
         text = self.stem(text)
@@ -193,40 +262,25 @@ class Prediction:
         
         return df
 
-    def fit(self, dframe):
+    def fit(self, dframe, features=None):
+        """Full fit on dframe's text/class columns. ``features`` are the
+        cached token streams of those rows (see feature_cache), which spare
+        the vectorizer and the LSTM tokenizer a pass over the text."""
+        started = time.perf_counter()
         labels = dframe['class']
         text = dframe['text']
         dframe['text'] = dframe['text'].fillna("")
         text = text.fillna("")
-        self.vect.fit(text)
-        v = self.vect.transform(text)
-        self.OC.fit(v, labels)
-        print(f'{self.OC} trained.')
-        self.RF.fit(v, labels)
-        print(f'{self.RF} trained.')
-        self.LR.fit(v, labels)
-        print(f'{self.LR} trained.')
-        self.GB.fit(v, labels)
-        print(f'{self.GB} trained.')
-        tokenized_texts = [self.tokenizer.tokenize(self.clean_text_(text)) for text in dframe['text']]
-        self.vocab = self.build_vocab(tokenized_texts)
-
-        sequences = self.preprocess_data(dframe, self.vocab)
-        dframe['sequences'] = sequences
-
-        max_length = 100
-        padded_sequences = self.pad_sequences(sequences, max_length)
-
-        dframe['padded_sequences'] = padded_sequences
-        sequences_tensor = torch.tensor(padded_sequences)
-        labels_tensor = torch.tensor(dframe['class'].values)
-
-        dataset = TensorDataset(sequences_tensor, labels_tensor)
-        dataloader = DataLoader(dataset, batch_size=2, shuffle=True)
+        if features is None:
+            terms, tokenized_texts = self.analyze(text)
+            v, vect_report = timed(fit_transform_tokens, self.vect, terms)
+        else:
+            v, vect_report = timed(fit_transform_tokens, self.vect, features.tfidf_docs())
+            tokenized_texts = features.lstm_docs()
+        if RF_JOBS:
+            self.RF.set_params(n_jobs=RF_JOBS)
 
-        for batch in dataloader:
-            inputs, labels = batch
-            # print(inputs, labels)
+        self.vocab = self.build_vocab(tokenized_texts)
 
         embedding_dim = 100
         hidden_dim = 256
@@ -235,50 +289,124 @@ class Prediction:
         bidirectional = True
         dropout = 0.5
         model = FakeNewsLSTM(len(self.vocab), embedding_dim, hidden_dim, output_dim, n_layers, bidirectional, dropout)
+        model.packed = True
 
-        criterion = nn.BCELoss()
-        optimizer = optim.Adam(model.parameters(), lr=0.001)
-
-        num_epochs = 2
-        for epoch in range(num_epochs):
-            model.train()
-            epoch_loss = 0
-            for batch in dataloader:
-                text, labels = batch
-                optimizer.zero_grad()
-                predictions = model(text).squeeze(1)
-                loss = criterion(predictions, labels.float())
-                loss.backward()
-                optimizer.step()
-                epoch_loss += loss.item()
-            
-            print(f'Epoch {epoch+1}, Loss: {epoch_loss / len(dataloader)}')
-        self.pt = model
-    def save_models(self):        
-        with open(os.path.dirname(__file__) + '\\RF.pkl', 'wb') as f:
-            pickle.dump(self.RF, f)
-        with open(os.path.dirname(__file__) + '\\GB.pkl', 'wb') as f:
-            pickle.dump(self.GB, f)
-        with open(os.path.dirname(__file__) + '\\LR.pkl', 'wb') as f:
-            pickle.dump(self.LR, f)
-        with open(os.path.dirname(__file__) + '\\OC.pkl', 'wb') as f:
-            pickle.dump(self.OC, f)
-        with open(os.path.dirname(__file__) + '\\vect.pkl', 'wb') as f:
-            pickle.dump(self.vect, f)
-        with open(os.path.dirname(__file__) + '\\PT.pkl', 'wb') as f:
-            pickle.dump(self.pt, f)
-        with open(os.path.dirname(__file__) + '\\vocab.pkl', 'wb') as f:
-            pickle.dump(self.vocab, f)
-
-    def predict(self, s=None):
+        # The sklearn members train in worker processes while the LSTM
+        # trains here.
+        members = {"OC": self.OC, "RF": self.RF, "LR": self.LR, "GB": self.GB}
+        fitted, reports, self.pt = fit_members(
+            members, v, labels.values,
+            overlap=lambda: self.train_lstm(model, tokenized_texts, labels.values, lr=0.001, run="full"),
+        )
+        for name, member in fitted.items():
+            setattr(self, name, member)
+            print(f'{member} trained.')
+        reports["PT"] = reports.pop("overlap")
+        reports["vect"] = vect_report
+        self.record_metrics(v, labels)
+
+        self.training_report = {
+            "mode": "full",
+            "rows": len(dframe),
+            "parallel": PARALLEL,
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "members": reports,
+        }
+        print(f"Training report: {self.training_report}")
+
+    def lstm_dataset(self, tokenized_texts, labels):
+        """(window, label) pairs for every LSTM window of every text."""
+        dataset = []
+        for seq, label in zip(self.texts_to_sequences(tokenized_texts), labels):
+            for window in self.lstm_windows(seq):
+                dataset.append((window, int(label)))
+        return dataset
+
+    def train_lstm(self, model, tokenized_texts, labels, lr, max_epochs=None, run=None):
+        """Train ``model`` on the windows of the tokenized texts with
+        lstm_trainer, holding out a share of the texts for early stopping."""
+        from .lstm_trainer import LSTMTrainer, MAX_EPOCHS, split_texts
+        tokenized_texts, labels = list(tokenized_texts), list(labels)
+        train_idx, val_idx = split_texts(len(tokenized_texts))
+        train_set = self.lstm_dataset([tokenized_texts[i] for i in train_idx], [labels[i] for i in train_idx])
+        val_set = self.lstm_dataset([tokenized_texts[i] for i in val_idx], [labels[i] for i in val_idx])
+        trainer = LSTMTrainer(lr, max_epochs=max_epochs or MAX_EPOCHS, run=run)
+        model, self.training_metrics["PT"] = trainer.train(model, train_set, val_set)
+        return model
+
+    def record_metrics(self, v, labels, names=("OC", "LR", "GB", "RF")):
+        for name in names:
+            self.training_metrics[name] = {
+                "training_rows": len(labels),
+                "train_accuracy": float(getattr(self, name).score(v, labels)),
+            }
+
+    def supports_incremental(self):
+        """True if the current artifacts can be updated without a full refit:
+        at least one member with partial_fit and a packed LSTM to fine-tune."""
+        linear = any(hasattr(m, "partial_fit") for m in (self.OC, self.LR, self.GB, self.RF))
+        return linear and getattr(self.pt, "packed", False)
+
+    def fit_incremental(self, dframe, lstm_epochs=2, lstm_lr=1e-4, features=None):
+        """Update the ensemble with new rows only.
+
+        The fitted TF-IDF vocabulary and the LSTM vocabulary are kept as they
+        are (unseen words count as unknown), members with ``partial_fit`` take
+        one pass over the new rows and the existing LSTM is fine-tuned on them
+        with a small learning rate. Members without ``partial_fit`` (the tree
+        ensembles) keep their weights until the next full fit().
+        """
+        started = time.perf_counter()
+        text = dframe['text'].fillna("")
+        labels = dframe['class'].values
+        if features is None:
+            terms, tokenized_texts = self.analyze(text)
+            v = transform_tokens(self.vect, terms)
+        else:
+            v = transform_tokens(self.vect, features.tfidf_docs())
+            tokenized_texts = features.lstm_docs()
+        reports, updated = {}, []
+        for name in ("OC", "LR", "GB", "RF"):
+            model = getattr(self, name)
+            if hasattr(model, "partial_fit"):
+                _, reports[name] = timed(model.partial_fit, v, labels, [0, 1])
+                updated.append(name)
+                print(f'{model} updated.')
+            else:
+                # Scoring these on the new rows would describe the previous
+                # version's weights as this one's.
+                self.training_metrics[name] = {"carried_over": True}
+        self.record_metrics(v, labels, updated)
+        self.pt, reports["PT"] = timed(
+            self.train_lstm, self.pt, tokenized_texts, labels, lstm_lr, lstm_epochs, "incremental")
+
+        self.training_report = {
+            "mode": "incremental",
+            "rows": len(dframe),
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "members": reports,
+        }
+        print(f"Training report: {self.training_report}")
+
+    def save_models(self, metadata=None):
+        """Write the artifacts as a new version of the artifact store and
+        return its id; the trainer publishes it once everything is on disk."""
+        from .artifacts import write_version
+        return write_version(self, metadata)
+
+    def normalize(self, s):
+        return self.stem(self.removeCharacters(s))
+
+    def predict(self, s=None, normalized=False):
         if s==None:
             sss = input()
         else:
             sss =s 
         sss = pd.DataFrame([sss], columns=["text"])
-        sss["text"] = sss["text"].apply(self.removeCharacters)
-        sss["text"] = sss["text"].apply(self.stem)
-        nv = self.vect.transform(sss["text"])
+        if not normalized:
+            sss["text"] = sss["text"].apply(self.normalize)
+        terms, tokens = self.analyze(sss["text"])
+        nv = transform_tokens(self.vect, terms)
         #self.m.eval()
         #tc = self.m(torch.tensor(scipy.sparse.csr_matrix.todense(nv)).float())
         #ps = torch.exp(tc)
@@ -287,12 +415,8 @@ class Prediction:
         self.ms = self.OC.predict(nv)
         self.ns = self.LR.predict(nv)
         self.o = self.GB.predict(nv)
-        ss = self.preprocess_data(sss, self.vocab)
-        sss['sequences'] = ss
-        max_length = 100
-        ps = self.pad_sequences(ss, max_length)
-        ip = torch.tensor(ps)
-        self.op = self.pt(ip)
+        ss = self.texts_to_sequences(tokens)
+        self.op = torch.tensor([self.score_sequences(ss)])
         
         if self.ms[0]==0:
             print("FAKE")
@@ -317,3 +441,32 @@ class Prediction:
             print("REAL")
 
         return [self.ms.item(), self.ns.item(), self.o.item(),self.p.item(), self.op.item()]
+
+    def predict_many(self, texts, batch_size=64, normalized=False):
+        """Score many documents at once.
+
+        The TF-IDF transform and each sklearn model run once over the whole
+        batch and the LSTM runs over length-bucketed chunks of ``batch_size``
+        windows.
+        Returns one percentage per text, in the format of get_percent().
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        if not normalized:
+            texts = [self.normalize(t) for t in texts]
+        # One tokenization per text feeds both the TF-IDF and LSTM branches.
+        terms, tokens = self.analyze(texts)
+        nv = transform_tokens(self.vect, terms)
+        rf = self.RF.predict(nv)
+        oc = self.OC.predict(nv)
+        lr = self.LR.predict(nv)
+        gb = self.GB.predict(nv)
+
+        sequences = self.texts_to_sequences(tokens)
+        lstm = self.score_sequences(sequences, batch_size)
+
+        return [
+            self.to_percent([oc[i].item(), lr[i].item(), gb[i].item(), rf[i].item(), lstm[i]])
+            for i in range(len(texts))
+        ]
@@ -0,0 +1,257 @@
+"""
+Versioned model artifact store.
+
+Every training run writes a complete set of artifacts into its own
+directory under ``versions/`` and only then points ``versions/manifest.json``
+at it, so readers always see either the previous or the new set, never a mix:
+
+    versions/
+        manifest.json              {"current": "<version>", "history": [...]}
+        <version>/
+            metadata.json          checksums, sizes, training rows, metrics
+            training_report.json   per-member wall/CPU time and RSS peak/growth
+            OC.joblib ... vocab.joblib
+            PT.pt, PT.json         LSTM state_dict and constructor arguments
+            PT.ts                  TorchScript export for serving (optional)
+            PT.int8.ts             quantized export, with LSTM_QUANTIZE=1 (optional)
+
+The sklearn members, the vectorizer and the vocab are uncompressed joblib
+files, loaded with ``mmap_mode="r"`` so their NumPy buffers are mapped from
+the page cache and shared between worker processes. The LSTM state_dict is
+loaded the same way (``torch.load(mmap=True)``). Checksums are verified on
+every load; if a published version turns out bad, rollback() points the
+manifest back at the previous one.
+
+Until the first versioned run, the flat *.pkl files next to this module are
+served as the "initial" version.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime
+
+import joblib
+import torch
+
+from .Prediction import FakeNewsLSTM
+from .inference import QUANTIZE, export_torchscript, load_lstm, prepare_for_inference, script_name
+from .stemmer import MODEL_DIR
+
+STORE_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(MODEL_DIR, "versions"))
+MANIFEST_FILE = os.path.join(STORE_DIR, "manifest.json")
+KEEP_VERSIONS = int(os.getenv("MODEL_STORE_KEEP", "3"))
+
+# Order matches the Prediction(...) constructor arguments.
+ARTIFACTS = ["OC", "LR", "GB", "RF", "PT", "vect", "vocab"]
+ATTRIBUTES = {"PT": "pt"}
+
+INITIAL_VERSION = "initial"
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def sha256sum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def current_version():
+    return read_manifest().get("current") or INITIAL_VERSION
+
+
+def version_dir(version):
+    return os.path.join(STORE_DIR, version)
+
+
+def read_metadata(version):
+    if version == INITIAL_VERSION:
+        return {}
+    with open(os.path.join(version_dir(version), "metadata.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lstm_config(model):
+    return {
+        "vocab_size": model.embedding.num_embeddings,
+        "embedding_dim": model.embedding.embedding_dim,
+        "hidden_dim": model.lstm.hidden_size,
+        "output_dim": model.fc.out_features,
+        "n_layers": model.lstm.num_layers,
+        "bidirectional": model.lstm.bidirectional,
+        "dropout": model.dropout.p,
+    }
+
+
+def write_version(predictor, metadata=None, version=None):
+    """Write every artifact of ``predictor`` into a new version directory.
+
+    The directory is assembled under a temporary name and renamed into
+    place, so a crash mid-write never leaves a partial version behind.
+    ``metadata`` (training rows, state, ...) is stored with the checksums.
+    Returns the version id; call publish() to make it current.
+    """
+    version = version or datetime.now().strftime("%Y%m%d%H%M%S%f")
+    final = version_dir(version)
+    tmp = final + ".partial"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    metrics = getattr(predictor, "training_metrics", {})
+    files = {}
+    for name in ARTIFACTS:
+        obj = getattr(predictor, ATTRIBUTES.get(name, name))
+        if name == "PT":
+            config = dict(lstm_config(obj), packed=getattr(obj, "packed", False))
+            torch.save(obj.state_dict(), os.path.join(tmp, "PT.pt"))
+            write_json(os.path.join(tmp, "PT.json"), config)
+            files[name] = ["PT.pt", "PT.json"]
+            for quantize in sorted({False, QUANTIZE}):
+                try:
+                    export_torchscript(obj, os.path.join(tmp, script_name(quantize)), quantize=quantize)
+                    files[name].append(script_name(quantize))
+                except Exception as e:
+                    print(f"TorchScript export of {script_name(quantize)} failed, serving from the state_dict: {e}")
+        else:
+            # Uncompressed, so the arrays can be memory-mapped on load.
+            joblib.dump(obj, os.path.join(tmp, name + ".joblib"))
+            files[name] = [name + ".joblib"]
+
+    artifacts = {}
+    for name, names in files.items():
+        artifacts[name] = {
+            "files": {
+                file: {
+                    "sha256": sha256sum(os.path.join(tmp, file)),
+                    "bytes": os.path.getsize(os.path.join(tmp, file)),
+                }
+                for file in names
+            },
+            "metrics": metrics.get(name, {}),
+        }
+    if getattr(predictor, "training_report", None):
+        write_json(os.path.join(tmp, "training_report.json"), predictor.training_report)
+    write_json(os.path.join(tmp, "metadata.json"), {
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "artifacts": artifacts,
+        **(metadata or {}),
+    })
+    os.replace(tmp, final)
+    return version
+
+
+def publish(version):
+    """Atomically make ``version`` current and prune old versions."""
+    manifest = read_manifest()
+    history = [version] + [v for v in manifest.get("history", []) if v != version]
+    history = history[:max(KEEP_VERSIONS, 2)]
+    write_json(MANIFEST_FILE, {
+        "current": version,
+        "published_at": datetime.now().isoformat(),
+        "history": history,
+    })
+    for entry in os.listdir(STORE_DIR):
+        path = os.path.join(STORE_DIR, entry)
+        if os.path.isdir(path) and entry not in history and not entry.endswith(".partial"):
+            shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+def rollback():
+    """Make the previous manifest history entry current again and drop the
+    current one from the history (its directory goes with the next publish).
+    Returns the restored version."""
+    manifest = read_manifest()
+    history = manifest.get("history", [])
+    if len(history) < 2:
+        raise ArtifactError("No previous version to roll back to")
+    write_json(MANIFEST_FILE, {
+        "current": history[1],
+        "published_at": datetime.now().isoformat(),
+        "rolled_back_from": history[0],
+        "history": history[1:],
+    })
+    return history[1]
+
+
+def verified_path(version, metadata, name, file):
+    path = os.path.join(version_dir(version), file)
+    expected = metadata["artifacts"][name]["files"][file]["sha256"]
+    if sha256sum(path) != expected:
+        raise ArtifactError(f"Checksum mismatch for {path}")
+    return path
+
+
+def load_versioned_lstm(version, metadata, trainable=False):
+    files = metadata["artifacts"]["PT"]["files"]
+    if not trainable and script_name(QUANTIZE) in files:
+        path = verified_path(version, metadata, "PT", script_name(QUANTIZE))
+        return prepare_for_inference(torch.jit.load(path, map_location="cpu")), path
+
+    with open(verified_path(version, metadata, "PT", "PT.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    packed = config.pop("packed", False)
+    model = FakeNewsLSTM(**config)
+    path = verified_path(version, metadata, "PT", "PT.pt")
+    # Inference keeps the mapped tensors (assign=True) instead of copying them
+    # into freshly allocated parameters.
+    state = torch.load(path, map_location="cpu", mmap=not trainable, weights_only=True)
+    model.load_state_dict(state, assign=not trainable)
+    model.packed = packed
+    return (model if trainable else prepare_for_inference(model, quantize=QUANTIZE)), path
+
+
+def iter_artifacts(version, trainable=False):
+    """Yield (name, object, path) for each artifact of ``version``, in
+    Prediction(...) argument order.
+
+    Serving loads are memory-mapped and read-only; ``trainable=True`` loads
+    private, writable copies (and the LSTM as an nn.Module, not TorchScript)
+    for the trainer to update.
+    """
+    if version == INITIAL_VERSION:
+        for name in ARTIFACTS:
+            if name == "PT":
+                if trainable:
+                    path = os.path.join(MODEL_DIR, "PT.pkl")
+                    with open(path, "rb") as f:
+                        yield name, pickle.load(f), path
+                else:
+                    model, path = load_lstm()
+                    yield name, model, path
+                continue
+            path = os.path.join(MODEL_DIR, name + ".pkl")
+            with open(path, "rb") as f:
+                yield name, pickle.load(f), path
+        return
+
+    metadata = read_metadata(version)
+    for name in ARTIFACTS:
+        if name == "PT":
+            model, path = load_versioned_lstm(version, metadata, trainable)
+            yield name, model, path
+            continue
+        path = verified_path(version, metadata, name, name + ".joblib")
+        yield name, joblib.load(path, mmap_mode=None if trainable else "r"), path
@@ -0,0 +1,131 @@
+"""
+Concurrent training of the ensemble members, with timing.
+
+The sklearn members only share the (read-only) TF-IDF matrix, so
+fit_members() fits each of them in its own process while the caller's
+``overlap`` task (the LSTM) trains in this one; a full fit then takes about
+as long as its slowest member. Every member gets a report with its wall
+time, CPU time (including threads the estimator starts, such as a
+RandomForest with n_jobs) and its memory: the peak RSS sampled while it ran
+and how far that is above the RSS it started at. Sampling reads
+/proc/self/statm every TRAINING_RSS_SAMPLE_MS, so elsewhere only the
+process-lifetime peak (ru_maxrss) is reported, labelled as such.
+
+TRAINING_PARALLEL=0 fits the members one after another with the same
+reports; TRAINING_WORKERS caps the pool size.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PARALLEL = os.getenv("TRAINING_PARALLEL", "1") == "1"
+WORKERS = int(os.getenv("TRAINING_WORKERS", "4"))
+RSS_SAMPLE_MS = int(os.getenv("TRAINING_RSS_SAMPLE_MS", "50"))
+
+
+def peak_memory_mb():
+    """Peak RSS over the whole life of this process."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb():
+    """RSS of this process right now, or None without /proc."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RSSSampler:
+    """Tracks the highest RSS seen between start() and stop()."""
+
+    def __init__(self, interval=RSS_SAMPLE_MS / 1000):
+        self.interval = interval
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._done = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        rss = current_rss_mb()
+        if rss is not None and rss > self.peak_mb:
+            self.peak_mb = rss
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self.start_mb is not None:
+            self._thread = threading.Thread(target=self.run, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self.sample()
+
+
+def timed(fn, *args):
+    """(fn(*args), report) with wall/CPU seconds and the RSS fn(*args)
+    peaked at."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    sampler = RSSSampler().start()
+    try:
+        result = fn(*args)
+    finally:
+        sampler.stop()
+    report = {
+        "wall_seconds": round(time.perf_counter() - wall, 3),
+        "cpu_seconds": round(time.process_time() - cpu, 3),
+        "pid": os.getpid(),
+    }
+    if sampler.start_mb is not None:
+        report["peak_rss_mb"] = round(sampler.peak_mb, 1)
+        report["rss_growth_mb"] = round(sampler.peak_mb - sampler.start_mb, 1)
+    else:
+        peak = peak_memory_mb()
+        report["process_peak_rss_mb"] = None if peak is None else round(peak, 1)
+    return result, report
+
+
+def fit_member(name, model, v, labels):
+    model, report = timed(model.fit, v, labels)
+    return name, model, report
+
+
+def fit_members(models, v, labels, overlap=None):
+    """Fit every {name: estimator} on (v, labels) and run ``overlap()``
+    meanwhile. Returns ({name: fitted}, {name: report}, overlap's result);
+    the overlap task is reported as "overlap"."""
+    fitted, reports = {}, {}
+    overlap_result = None
+    if not PARALLEL or len(models) < 2:
+        for name, model in models.items():
+            _, fitted[name], reports[name] = fit_member(name, model, v, labels)
+        if overlap is not None:
+            overlap_result, reports["overlap"] = timed(overlap)
+        return fitted, reports, overlap_result
+
+    # spawn: the parent already runs torch, which doesn't survive fork well.
+    with ProcessPoolExecutor(max_workers=min(WORKERS, len(models)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(fit_member, name, model, v, labels) for name, model in models.items()]
+        if overlap is not None:
+            overlap_result, reports["overlap"] = timed(overlap)
+        for future in futures:
+            name, model, report = future.result()
+            fitted[name], reports[name] = model, report
+    return fitted, reports, overlap_result
@@ -0,0 +1,254 @@
+"""
+Per-article feature cache for training.
+
+Cleaning and tokenizing every historical description on each retrain costs
+more than most of the fits, so the trainer keeps the results on disk, keyed
+by News id and a hash of the description:
+
+    feature_cache/
+        current.json            {"generation": "<gen>"}
+        <gen>/
+            meta.json           format, analyzer key, row and token counts
+            lexicon.json        token strings; the arrays hold their indices
+            ids.npy             News ids (int64)
+            hashes.npy          blake2b-64 of each description (uint64)
+            lstm_offsets.npy    CSR-style offsets into lstm_tokens (int64)
+            lstm_tokens.npy     LSTM tokens (int32)
+            tfidf_offsets.npy   offsets into tfidf_tokens (int64)
+            tfidf_tokens.npy    TF-IDF analyzer terms (int32)
+
+Both streams come from Prediction.analyze_text().
+
+sync() processes only articles that are new or whose description changed,
+writes a new generation and switches current.json to it; the columns are
+memory-mapped when training reads them.
+
+TF-IDF rows are cached as the analyzer's terms rather than weighted rows,
+since a full rebuild refits the IDF weights every time; fit_transform_tokens()
+and transform_tokens() give the same matrix as vect.fit_transform(texts) and
+vect.transform(texts) without analyzing the text again. Changing the
+vectorizer's analysis parameters, or FORMAT, starts the cache afresh.
+
+TRAINING_FEATURE_CACHE=0 turns the cache off.
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .stemmer import MODEL_DIR
+
+CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", os.path.join(MODEL_DIR, "feature_cache"))
+ENABLED = os.getenv("TRAINING_FEATURE_CACHE", "1") == "1"
+# Bump when clean_devanagari or the LSTM tokenizer change their output.
+FORMAT = 1
+
+ANALYSIS_PARAMS = ("input", "encoding", "decode_error", "strip_accents", "lowercase", "preprocessor",
+                   "tokenizer", "analyzer", "stop_words", "token_pattern", "ngram_range")
+STREAMS = ("lstm", "tfidf")
+
+
+def content_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def analyzer_key(vect):
+    params = vect.get_params()
+    return repr([(name, params.get(name)) for name in ANALYSIS_PARAMS])
+
+
+def pretokenized(tokens):
+    return tokens
+
+
+def with_tokens(vect):
+    """A shallow copy of ``vect`` that reads cached analyzer output instead
+    of raw text; it shares the fitted vocabulary and IDF weights."""
+    passthrough = copy.copy(vect)
+    passthrough.analyzer = pretokenized
+    passthrough.token_pattern = None
+    return passthrough
+
+
+def fit_transform_tokens(vect, docs):
+    """vect.fit_transform(texts), given each text's analyzer output."""
+    passthrough = with_tokens(vect)
+    matrix = passthrough.fit_transform(docs)
+    params = vect.get_params()
+    vect.__dict__.update({k: v for k, v in passthrough.__dict__.items() if k not in params})
+    return matrix
+
+
+def transform_tokens(vect, docs):
+    return with_tokens(vect).transform(docs)
+
+
+class Features:
+    """Cached token streams for one training frame, in its row order."""
+
+    def __init__(self, columns, lexicon, rows):
+        self.columns = columns
+        self.lexicon = lexicon
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def doc(self, stream, row):
+        offsets = self.columns[stream + "_offsets"]
+        ids = self.columns[stream + "_tokens"][offsets[row]:offsets[row + 1]]
+        lexicon = self.lexicon
+        return [lexicon[i] for i in ids.tolist()]
+
+    def lstm_docs(self):
+        return [self.doc("lstm", row) for row in self.rows]
+
+    def tfidf_docs(self):
+        # A generator: the vectorizer makes a single pass over it.
+        return (self.doc("tfidf", row) for row in self.rows)
+
+
+class FeatureCache:
+    def __init__(self, path=CACHE_DIR):
+        self.path = path
+
+    def current(self):
+        try:
+            with open(os.path.join(self.path, "current.json"), "r", encoding="utf-8") as f:
+                return json.load(f)["generation"]
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def load(self, key):
+        """(columns, lexicon) of the current generation, or empty ones if
+        there is none or it was built with a different key."""
+        generation = self.current()
+        if generation:
+            directory = os.path.join(self.path, generation)
+            with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("key") == key:
+                with open(os.path.join(directory, "lexicon.json"), "r", encoding="utf-8") as f:
+                    lexicon = json.load(f)
+                columns = {
+                    name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+                    for name in self.column_names()
+                }
+                return columns, lexicon
+        columns = {"ids": np.zeros(0, np.int64), "hashes": np.zeros(0, np.uint64)}
+        for stream in STREAMS:
+            columns[stream + "_offsets"] = np.zeros(1, np.int64)
+            columns[stream + "_tokens"] = np.zeros(0, np.int32)
+        return columns, []
+
+    @staticmethod
+    def column_names():
+        return ["ids", "hashes"] + [stream + suffix for stream in STREAMS for suffix in ("_offsets", "_tokens")]
+
+    def sync(self, ids, texts, predictor):
+        """Features for the rows (ids[i], texts[i]), computing only the
+        articles the cache doesn't hold yet."""
+        started = time.perf_counter()
+        vect = predictor.vect
+        key = {"format": FORMAT, "tfidf": analyzer_key(vect)}
+        columns, lexicon = self.load(key)
+        row_of = dict(zip(columns["ids"].tolist(), range(len(columns["ids"]))))
+        hashes = columns["hashes"]
+        keep = np.ones(len(hashes), dtype=bool)
+
+        token_index = {token: i for i, token in enumerate(lexicon)}
+
+        def encode(tokens):
+            encoded = []
+            for token in tokens:
+                i = token_index.get(token)
+                if i is None:
+                    i = token_index[token] = len(lexicon)
+                    lexicon.append(token)
+                encoded.append(i)
+            return encoded
+
+        added = {"ids": [], "hashes": [], "lstm": [], "tfidf": []}
+        added_row = {}
+        # Old rows are addressed by their index, new ones by -(j + 1) until
+        # the generation is written.
+        positions = []
+        for article_id, text in zip(ids, texts):
+            article_id, text = int(article_id), text or ""
+            digest = content_hash(text)
+            row = row_of.get(article_id)
+            if row is not None and keep[row] and hashes[row] == digest:
+                positions.append(row)
+                continue
+            if article_id in added_row:
+                positions.append(added_row[article_id])
+                continue
+            if row is not None:
+                keep[row] = False
+            added["ids"].append(article_id)
+            added["hashes"].append(digest)
+            terms, tokens = predictor.analyze_text(text)
+            added["lstm"].append(encode(tokens))
+            added["tfidf"].append(encode(terms))
+            added_row[article_id] = -len(added["ids"])
+            positions.append(added_row[article_id])
+
+        reused = len(positions) - len(added["ids"])
+        if added["ids"] or not keep.all():
+            columns = self.write(columns, keep, added, lexicon, key)
+        kept = int(keep.sum())
+        position_of_old = np.cumsum(keep) - 1
+        rows = np.array(
+            [position_of_old[p] if p >= 0 else kept - p - 1 for p in positions], dtype=np.int64)
+        print(f"Feature cache: {reused} articles reused, {len(added['ids'])} processed "
+              f"in {time.perf_counter() - started:.2f}s")
+        return Features(columns, lexicon, rows)
+
+    def write(self, columns, keep, added, lexicon, key):
+        """Write kept rows plus ``added`` as a new generation and make it
+        current; returns its memory-mapped columns."""
+        new = {
+            "ids": np.concatenate([columns["ids"][keep], np.array(added["ids"], dtype=np.int64)]),
+            "hashes": np.concatenate([columns["hashes"][keep], np.array(added["hashes"], dtype=np.uint64)]),
+        }
+        for stream in STREAMS:
+            offsets, tokens = columns[stream + "_offsets"], columns[stream + "_tokens"]
+            lengths = np.diff(offsets)
+            kept_tokens = tokens[np.repeat(keep, lengths)]
+            added_lengths = np.array([len(doc) for doc in added[stream]], dtype=np.int64)
+            added_tokens = np.fromiter((i for doc in added[stream] for i in doc),
+                                       dtype=np.int32, count=int(added_lengths.sum()))
+            new[stream + "_offsets"] = np.concatenate(
+                [[0], np.cumsum(np.concatenate([lengths[keep], added_lengths]))]).astype(np.int64)
+            new[stream + "_tokens"] = np.concatenate([kept_tokens, added_tokens])
+
+        generation = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        directory = os.path.join(self.path, generation)
+        os.makedirs(directory)
+        for name, array in new.items():
+            np.save(os.path.join(directory, name + ".npy"), array)
+        with open(os.path.join(directory, "lexicon.json"), "w", encoding="utf-8") as f:
+            json.dump(lexicon, f, ensure_ascii=False)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "key": key,
+                "rows": len(new["ids"]),
+                "tokens": {stream: len(new[stream + "_tokens"]) for stream in STREAMS},
+                "created_at": datetime.now().isoformat(),
+            }, f, indent=2)
+
+        tmp = os.path.join(self.path, "current.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation}, f)
+        os.replace(tmp, os.path.join(self.path, "current.json"))
+        for entry in os.listdir(self.path):
+            path = os.path.join(self.path, entry)
+            if entry != generation and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+        return {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r") for name in new}
@@ -0,0 +1,95 @@
+"""
+CPU inference path for FakeNewsLSTM.
+
+The pickled PT.pkl is a training-mode module: dropout stays active and every
+call records an autograd graph. Everything that serves predictions goes
+through here instead, so the LSTM always runs in eval mode under
+torch.inference_mode(), optionally with int8 dynamic quantization of the
+LSTM/Linear layers, and preferably from the exported TorchScript artifact:
+PT.ts, or PT.int8.ts when LSTM_QUANTIZE=1. With quantization on and no
+PT.int8.ts, the pickle is quantized at load time; a float PT.ts is never
+served in its place.
+
+Export the current PT.pkl by hand with:
+
+    python -m Main.TrainingModel.inference [--quantize]
+"""
+import copy
+import os
+import pickle
+import sys
+
+import torch
+import torch.nn as nn
+
+from .stemmer import MODEL_DIR
+
+PICKLE_PATH = os.path.join(MODEL_DIR, "PT.pkl")
+QUANTIZE = os.getenv("LSTM_QUANTIZE", "0") == "1"
+
+
+def script_name(quantize=False):
+    return "PT.int8.ts" if quantize else "PT.ts"
+
+
+def prepare_for_inference(model, quantize=False):
+    model.eval()
+    if quantize and not isinstance(model, torch.jit.ScriptModule):
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+        model.eval()
+    return model
+
+
+def export_torchscript(model, path=None, quantize=False):
+    """Write ``model`` as a TorchScript artifact next to the pickles.
+
+    A copy is exported, so ``model`` keeps its training mode and weights.
+    """
+    path = path or os.path.join(MODEL_DIR, script_name(quantize))
+    model = prepare_for_inference(copy.deepcopy(model), quantize=quantize)
+    packed = getattr(model, "packed", False)
+    try:
+        scripted = torch.jit.script(model)
+    except Exception:
+        if packed:
+            raise
+        # Tracing is enough for unpacked models: the only branch taken in
+        # forward() depends on a constructor argument, and the LSTM op
+        # itself is length-agnostic.
+        example = torch.zeros((2, 100), dtype=torch.long)
+        with torch.inference_mode():
+            scripted = torch.jit.trace(model, example)
+    scripted = torch.jit.freeze(scripted.eval(), preserved_attrs=["packed"] if packed else None)
+    tmp = path + ".tmp"
+    torch.jit.save(scripted, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load_lstm(model_dir=MODEL_DIR, quantize=QUANTIZE):
+    """Return (model, path) for the LSTM, preferring the TorchScript export."""
+    script_path = os.path.join(model_dir, script_name(quantize))
+    if os.path.exists(script_path):
+        model = torch.jit.load(script_path, map_location="cpu")
+        return prepare_for_inference(model), script_path
+
+    pickle_path = os.path.join(model_dir, "PT.pkl")
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    return prepare_for_inference(model, quantize=quantize), pickle_path
+
+
+def lstm_scores(model, inputs, lengths=None):
+    """Sigmoid outputs of the LSTM for a LongTensor batch of token ids."""
+    if model.training:
+        model.eval()
+    with torch.inference_mode():
+        if lengths is None:
+            return model(inputs)
+        return model(inputs, lengths)
+
+
+if __name__ == "__main__":
+    with open(PICKLE_PATH, "rb") as f:
+        lstm = pickle.load(f)
+    print(export_torchscript(lstm, quantize="--quantize" in sys.argv[1:]))
@@ -0,0 +1,219 @@
+"""
+Training loop for FakeNewsLSTM.
+
+Windows are batched LSTM_BATCH_SIZE at a time from length-sorted buckets, so
+a batch is padded only to its own longest window. A held-out share of the
+texts (LSTM_VAL_FRACTION, split by text so windows of one article never land
+on both sides) is scored after every epoch; training stops once the
+validation loss hasn't improved for LSTM_PATIENCE epochs and the best
+weights are restored. Gradients are clipped to LSTM_CLIP_NORM.
+
+After every epoch the model, the optimizer and the early-stopping state are
+written to LSTM_CHECKPOINT_DIR/<run>.pt. If a retrain dies, the next one with
+the same data (same windows and labels, by digest) picks up from the last
+finished epoch; the checkpoint is removed once training completes.
+
+LSTM_THREADS sets torch's intra-op threads for the duration of the run
+(0 keeps torch's default) and LSTM_LOADER_WORKERS moves batch collation into
+DataLoader worker processes.
+"""
+import copy
+import hashlib
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from torch.utils.data import DataLoader
+
+from .Prediction import BucketBatchSampler, collate_packed
+from .stemmer import MODEL_DIR
+
+BATCH_SIZE = int(os.getenv("LSTM_BATCH_SIZE", "32"))
+MAX_EPOCHS = int(os.getenv("LSTM_MAX_EPOCHS", "10"))
+PATIENCE = int(os.getenv("LSTM_PATIENCE", "2"))
+VAL_FRACTION = float(os.getenv("LSTM_VAL_FRACTION", "0.1"))
+CLIP_NORM = float(os.getenv("LSTM_CLIP_NORM", "1.0"))
+THREADS = int(os.getenv("LSTM_THREADS", "0"))
+LOADER_WORKERS = int(os.getenv("LSTM_LOADER_WORKERS", "0"))
+CHECKPOINT_DIR = os.getenv("LSTM_CHECKPOINT_DIR", os.path.join(MODEL_DIR, "checkpoints"))
+
+
+def split_texts(n, fraction=VAL_FRACTION, seed=0):
+    """(train, validation) index lists over n texts. Validation stays empty
+    when there are too few texts to spare one."""
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    held_out = int(n * fraction) if n >= 10 else 0
+    return sorted(order[held_out:]), sorted(order[:held_out])
+
+
+def dataset_digest(dataset):
+    """blake2b of every (window, label) pair, in order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for window, label in dataset:
+        ids = np.asarray(window, dtype=np.int64)
+        digest.update(len(ids).to_bytes(8, "little"))
+        digest.update(ids.tobytes())
+        digest.update(int(label).to_bytes(1, "little"))
+    return digest.hexdigest()
+
+
+class LSTMTrainer:
+    def __init__(self, lr, max_epochs=MAX_EPOCHS, batch_size=BATCH_SIZE, patience=PATIENCE,
+                 clip_norm=CLIP_NORM, threads=THREADS, loader_workers=LOADER_WORKERS, run=None):
+        self.lr = lr
+        self.max_epochs = max_epochs
+        self.batch_size = batch_size
+        self.patience = patience
+        self.clip_norm = clip_norm
+        self.threads = threads
+        self.loader_workers = loader_workers
+        self.checkpoint = os.path.join(CHECKPOINT_DIR, run + ".pt") if run else None
+
+    def loader(self, dataset, shuffle):
+        sampler = BucketBatchSampler([len(seq) for seq, _ in dataset], batch_size=self.batch_size, shuffle=shuffle)
+        return DataLoader(dataset, batch_sampler=sampler, collate_fn=collate_packed,
+                          num_workers=self.loader_workers, persistent_workers=self.loader_workers > 0)
+
+    def run_key(self, model, train_set, val_set):
+        # A checkpoint only resumes the same run on the same data.
+        return {
+            "train": dataset_digest(train_set),
+            "val": dataset_digest(val_set),
+            "vocab_size": model.embedding.num_embeddings,
+            "lr": self.lr,
+            "batch_size": self.batch_size,
+        }
+
+    def load_checkpoint(self, key):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return None
+        try:
+            state = torch.load(self.checkpoint, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"Ignoring unreadable LSTM checkpoint {self.checkpoint}: {e}")
+            return None
+        if state.get("key") != key:
+            print(f"Ignoring LSTM checkpoint {self.checkpoint} from a different run")
+            return None
+        return state
+
+    def save_checkpoint(self, state):
+        if not self.checkpoint:
+            return
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        tmp = self.checkpoint + ".tmp"
+        torch.save(state, tmp)
+        os.replace(tmp, self.checkpoint)
+
+    def should_stop(self, val_loader, bad_epochs):
+        # LSTM_PATIENCE=0 always runs max_epochs.
+        return val_loader is not None and self.patience > 0 and bad_epochs >= self.patience
+
+    def evaluate(self, model, dataloader, criterion):
+        model.eval()
+        total, count = 0.0, 0
+        with torch.no_grad():
+            for text, lengths, labels in dataloader:
+                predictions = model(text, lengths).squeeze(1)
+                total += criterion(predictions, labels.float()).item() * len(labels)
+                count += len(labels)
+        return total / count
+
+    def train(self, model, train_set, val_set=()):
+        """Train ``model`` on (window, label) pairs; returns (model, metrics)."""
+        previous_threads = torch.get_num_threads()
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        try:
+            return self._train(model, train_set, list(val_set))
+        finally:
+            torch.set_num_threads(previous_threads)
+
+    def _train(self, model, train_set, val_set):
+        train_loader = self.loader(train_set, shuffle=True)
+        val_loader = self.loader(val_set, shuffle=False) if val_set else None
+        criterion = nn.BCELoss()
+        optimizer = optim.Adam(model.parameters(), lr=self.lr)
+
+        key = self.run_key(model, train_set, val_set)
+        history, best_loss, best_state, bad_epochs, start = [], None, None, 0, 0
+        resumed = self.load_checkpoint(key)
+        if resumed:
+            model.load_state_dict(resumed["model"])
+            optimizer.load_state_dict(resumed["optimizer"])
+            history, best_loss = resumed["history"], resumed["best_loss"]
+            best_state, bad_epochs = resumed["best_state"], resumed["bad_epochs"]
+            start = resumed["epoch"]
+            print(f"Resuming LSTM training after epoch {start} from {self.checkpoint}")
+
+        stopped_early = self.should_stop(val_loader, bad_epochs)
+        for epoch in range(start, self.max_epochs):
+            if stopped_early:
+                break
+            started = time.perf_counter()
+            model.train()
+            epoch_loss, samples = 0.0, 0
+            for text, lengths, labels in train_loader:
+                optimizer.zero_grad()
+                predictions = model(text, lengths).squeeze(1)
+                loss = criterion(predictions, labels.float())
+                loss.backward()
+                if self.clip_norm:
+                    nn.utils.clip_grad_norm_(model.parameters(), self.clip_norm)
+                optimizer.step()
+                epoch_loss += loss.item() * len(labels)
+                samples += len(labels)
+            seconds = time.perf_counter() - started
+
+            entry = {
+                "epoch": epoch + 1,
+                "train_loss": round(epoch_loss / max(samples, 1), 5),
+                "seconds": round(seconds, 3),
+                "samples_per_sec": round(samples / seconds, 1) if seconds else None,
+            }
+            if val_loader is not None:
+                val_loss = self.evaluate(model, val_loader, criterion)
+                entry["val_loss"] = round(val_loss, 5)
+                if best_loss is None or val_loss < best_loss:
+                    best_loss, bad_epochs = val_loss, 0
+                    best_state = copy.deepcopy(model.state_dict())
+                else:
+                    bad_epochs += 1
+                stopped_early = self.should_stop(val_loader, bad_epochs)
+            history.append(entry)
+            print(f"Epoch {entry['epoch']}: {entry}")
+
+            self.save_checkpoint({
+                "key": key,
+                "epoch": epoch + 1,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "history": history,
+                "best_loss": best_loss,
+                "best_state": best_state,
+                "bad_epochs": bad_epochs,
+            })
+
+        if best_state is not None:
+            model.load_state_dict(best_state)
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+        return model, {
+            "epochs": len(history),
+            "max_epochs": self.max_epochs,
+            "batch_size": self.batch_size,
+            "stopped_early": stopped_early,
+            "resumed_from_epoch": start,
+            "train_windows": len(train_set),
+            "val_windows": len(val_set),
+            "best_val_loss": None if best_loss is None else round(best_loss, 5),
+            "final_loss": history[-1]["train_loss"] if history else None,
+            "samples_per_sec": [entry["samples_per_sec"] for entry in history],
+            "history": history,
+        }
@@ -0,0 +1,121 @@
+"""
+Single-pass replacement for the nested re.sub chain in
+Prediction.removeCharacters.
+
+The original chain only ever deletes characters from a fixed set of classes
+and then squeezes runs of spaces/tabs, so the whole thing folds into one
+codepoint translation table: unwanted codepoints map to None and tabs to a
+space. The class bodies below are the ones removeCharacters used, in the
+same order; "X-Y" is an inclusive range, exactly as it was inside [...].
+"""
+import os
+import re
+from functools import lru_cache
+
+from .stemmer import default_stemmer
+
+# Distinct words whose analysis is memoized per process.
+WORD_CACHE_SIZE = int(os.getenv("TOKEN_WORD_CACHE_SIZE", "200000"))
+# TfidfVectorizer's default token_pattern.
+TFIDF_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+TFIDF_DEFAULTS = {
+    "analyzer": "word", "input": "content", "lowercase": True, "preprocessor": None, "tokenizer": None,
+    "token_pattern": TFIDF_TOKEN_RE.pattern, "stop_words": None, "ngram_range": (1, 1), "strip_accents": None,
+}
+
+
+_REMOVED_CLASSES = [
+    # unparsed unicode char sequences
+    "\x00\x01\x10\x15\x16\x1a\x1e\x02\x03\x05\x06\x07\x08\x17\x1f\x7f\x81\x82\x83\x84\x85\x86\x88\x8d\x8f\x92\x93\x94\x95\x96\x9d\x9e\xa0\xad\uf047\uf0a8\u09b1\uf0af\uf106\u2003\u206e\u206f\u2002\u2009\u200a\u200b\u200c\u200d\u200e\u200f\u2028\u2029\u202a\u202c\u202d\u202f\u2060\u3000\ue86c\uf000\uf001\uf002\uf020\uf026\uf02a\uf02d\uf02f\uf034\uf038\uf03a\uf03c\uf03d\uf03f\uf040\uf046\uf061\uf065\uf06c\uf06d\uf06e\uf071\uf072\uf074\uf075\uf076\uf077\uf07d\uf085\uf096\uf0a2\uf0a7\uf0ab\uf0b6\uf0b7\uf0d8\uf0da\uf0dc\uf0e0\uf0fc\uf164\uf16a\uf339\uf3c6\uf449\uf44c\uf468\uf495\uf4fd\uf527\uf602\uf60a\uf62d\uf64f\uf8ea\uf8ff\ufeff\u0604\U00100000\U00100001\U001000a5\U001000f2\U0010012e\U001001d1\U001001d3\U00100223\U0010024d\u2063\u09b1",
+    # accented alphabets
+    "a-zA-Zａ-ｚＡ-Ｚ\u00C0-\u024F\u1E00-\u1EFF",
+    # Korean / CJK
+    "一-龠ぁ-ゔァ-ヴー々〆〤ヶアガシズタニネメルー下中亚亞人來公共区區古司吐吴和哔哩国國圳塞多客宮家山岡战戰文日春有木本朴村来民沙深相秋站粵織華蕃藏西言話語语贛載遥限音飯馬马鮨가공구국다대러민바박상서선스어울유의인재조주축팀표플한화ㄩㅎ㎡꞊ꣳ각간감강같개거건걸것게겠겨견경계고과관광교궁권귀그극근글금급기김까껴꼭나난남납내너넉넓네넥녀년노느는늘능니닝단담답당더도동되된됩두드들등디때떨띠라람랍래랩런럼럽레력로록론료를름릎리릭립마만말맛맞매맺멋메멘며면명모목무문물미및발방배번법베변별보복볼봉부분브비뿐사살생샵섯성세셔소송수쉬습시식신실십싸써아안않앙액양언업없었에여역연열영오와외요용우운워원월웠위육으은을음이일임입있자작잘잠장저적전점정제져존종좋준줍줏중즈즣지직진집징짠짱째차착찬참찾책천첫청체초최추출치카컬켓코크큰클키킹타탁터템토톤통트특튼티판팬페편평포프피필핏하학할함합항해햇행향허현혜호홈확환활황회후휴️ﹾ！，：？｜～ｪｫﾥﾧﾪ",
+    # symbols
+    "~¡£¤¥¦§¨©ª«¬®¯±²µ¶¹º»¼½¾৷੯ੰ–—―†‡•…‰‹›⁄₪€₱₹℅™⅓←→∈∉∑−∕∙√∛≈≠≡≤⋅┐├┬╕╖╗╛╡╢╣╦▇░▓■▪●⧼⧽（）‣￼�☺☼✊✋✌✍✏✓✔✴❆❤♫🇳🇵🌴🌷🌹🌺🌻🌽🌾🌿🎁🎤🎹🎼🏡🏼🏿🐍🐒👁👈👉👍👤👧👨👱💀💃💌💐💓💔💕💘💥💦💿📻🔥🔱🕸🖕😀😂😃😅😆😈😉😊😍😒😔😘😛😝😠😡😢😥😦😭🙁🙂🙈🙉🙊🙋🙏🚩🚫🤔🤣󠆶",
+    # Latin accents
+    "¿ÀÁÅÇÈÍÏÓÖ×ØÙÛÜÝÞàáâãäåæçèéêëìíîïðñòóôõö÷øùúüýĀāăćČčĐđĕėğĩīıłňŋŌōŏŒœřŚśŠšũūůųŸŹŽƒǎǧɑɒɔəɛɡɪɾʃʉʊʌʒʔḗṳạảẹẻẽếễệỉịọỏồụủἀἐἱἷᾶῥⲁⲏⲓⲕⲣ",
+    # Greek, Cyrillic, Armenian
+    "ʾˆˈˌːˑΐΕΣάέίαβγδεζηθικλμνξοπρςσυφωόύϩЄІАБВГЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдежзийклмнопрстуфхцчшъыьэюяёїҚқҡҧүҷӣԫՀաեյնր",
+    # Hebrew, Arabic, Urdu, Syriac, Thaana
+    "ִאבדוילןעפקרשת،ؒ؛؟ءآإئابةتثجحخدذرزسشصضطظعغفقكلمنهوىئًَُِّْ٪٫٬ٰٹپچڈډڑژښکڬگڵںھہۆیێېےۓﮐﺗﺠﻪﻫﻮ۔ۛ۰۱۲۳۴۵۶۷۸۹ܐܒܗܝܡܢܪܬހބވދސަިެް",
+    # Bengali, Gurmukhi, Gujarati, Tamil, Telugu, Thai, Tibetan, ...
+    "অআইউঋএঐওকখগঘঙচছজঝঞটঠডঢণতথদধনপফবভমযরলশষসহ়ািীুূেৈো্ৰৱ৳ਅਆਇਈਉਊਏਐਓਔਕਖਗਘਙਚਛਜਝਞਟਠਡਢਣਤਥਦਧਨਪਫਬਭਮਯਰਲਵਸਹ਼ਾਿੀੁੂੇੈੋੌ੍ੜ੦੧੨੩੪੫੬੭੮કગજઞતદનફમરષસાિીુેો્ଆଓଡ଼ିஅஇகஙசஜடதநனபமயரறலளழவஸாிீுூேைொ்అగతథనపమరలశహాిుూెొ్ಕಡನ್ംഅജഞപബമയരലളാിുോ്ංකනලසහිกขคงชญตทธนบปฟมยรลวศษสหอะัาำิีุเใไ่้์ຊດຕທນປລວສະັາິົໄ་།ཀཁགངཅཆཇཉཊཋཌཎཏཐདནཔཕབམཙཚཛཝཞཟའཡརལཤཥསཧཨིེོུྐྒྣྩྫྱྲྵྷစညတနပမရာုေံ္်ြაგთილმრუქማርኛአខភមរសាែ្ᤀᵻऽઅઇએઓચછઝપબયલવશહૌெంణಗಣಬರಳವಶೆೊഇഎഏഐഒകഖഗഘങചടഡണതഥദധനഫഭറഴവശഷസഹീൂെേൈൊൻർൽൾจฉซฒณดถผพภึืูแโๆ็๊๛ພ༺༻ྟྤྴဗბდევზკნოპსტფღყშჩცძწჭხჯჰᎦᎩᎯᎳᏂᏍᏣᏬᖳកគងចជញដណតថទធនបផពយលវហឡអឬឯឲិីឹុូួើៀេៃោៅំះៈ៉៊់៌៏័។៕១៥៨",
+    # leftover marks and symbols
+    "°³´·¸ɐɕɖɣɦɨɫɯɳɴʁʈʋʏʑʰʲʽˊˋ˗˘˚˜˝̵̷̡̧̞̩̪̭̯͈͙́̃̊̎̒̓ͧͬ̚͡ΑΒΔΖΗΘΙΚΛΜΝΟΠΡΤΥΦΧΩήτώДщєіјҫҳҶөӯԨստְֲֵַָֹֽ׀ׁׂהזחטךכםמנסץצؘؔأؤـٻڌڪ۩۾߮߰ऄ※₋℃№↑↩⇄⇒⇨∇∏∘∞⊕⊗⋲⎼④⑸─│┌╘►▼◄◊◌◎★☆☎☑☺☻♂♠♢♣♥♦♪⚠⛭✉❶❷❸❹❺➧⟲⟳⦁⭕、。《》「」『』【】🆚🇧🇬",
+]
+
+
+def _expand(chars):
+    i = 0
+    while i < len(chars):
+        if i + 2 < len(chars) and chars[i + 1] == "-":
+            yield from range(ord(chars[i]), ord(chars[i + 2]) + 1)
+            i += 3
+        else:
+            yield ord(chars[i])
+            i += 1
+
+
+REMOVE_TABLE = {cp: None for chars in _REMOVED_CLASSES for cp in _expand(chars)}
+REMOVE_TABLE[ord("\t")] = " "
+
+
+def remove_characters(text):
+    """Equivalent of the old removeCharacters(): drop the foreign scripts and
+    symbols, collapse runs of spaces/tabs to one space and strip."""
+    return " ".join(filter(None, text.translate(REMOVE_TABLE).split(" "))).strip()
+
+
+def clean_devanagari(text):
+    """Prediction.clean_text_: keep only Devanagari and whitespace, collapse
+    whitespace and drop punctuation (unless the text is a lone mark)."""
+    text = re.sub(r'[^\u0900-\u097F\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    puncts = r"$&+,:;=?@#|'<>.^*()%!-।"
+    if text in list(puncts):
+        return text
+    return re.sub(r"[$&+।।,:;=?@#|'<>.^*()%!-]", "", text)
+
+
+def purify(text):
+    """Prediction.getPurified without constructing a Prediction, so callers
+    that only need the stored-description form don't import the models."""
+    return default_stemmer().stem(clean_devanagari(text))
+
+
+def shared_analysis(vect):
+    """True if ``vect`` analyzes text the way tokenize_document() does, i.e.
+    it was built with the default word analyzer."""
+    params = vect.get_params()
+    return all(params.get(name) == value for name, value in TFIDF_DEFAULTS.items())
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def analyze_word(word):
+    """(TF-IDF terms, LSTM token) of one whitespace-delimited word.
+
+    Neither tokenizer matches across whitespace, so analyzing word by word
+    gives the same tokens as running each over the whole text:
+    clean_devanagari() keeps a word's Devanagari characters except the danda
+    (and deletes the rest without splitting), and the TfidfVectorizer
+    pattern runs on the lowercased word.
+    """
+    lstm = "".join(ch for ch in word if "\u0900" <= ch <= "\u097F" and ch != "।")
+    return tuple(TFIDF_TOKEN_RE.findall(word.lower())), lstm
+
+
+def tokenize_document(text):
+    """(TF-IDF terms, LSTM tokens) of a normalized text in one pass: what
+    the default-analyzer vectorizer and RegexpTokenizer(Devanagari) after
+    clean_devanagari() would produce separately."""
+    terms, tokens = [], []
+    for word in text.split():
+        word_terms, token = analyze_word(word)
+        terms.extend(word_terms)
+        if token:
+            tokens.append(token)
+    if not tokens and "।" in text:
+        # clean_devanagari keeps a danda that is the only thing left.
+        tokens = re.findall(r"[\u0900-\u097F]+", clean_devanagari(text))
+    return terms, tokens
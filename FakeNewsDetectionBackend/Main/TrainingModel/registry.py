@@ -0,0 +1,177 @@
+"""
+Process-wide registry for the trained model artifacts.
+
+Every worker process loads PT/RF/GB/LR/OC/vect/vocab (and the stemming
+dictionaries) exactly once and shares the resulting bundle read-only between
+request threads. A generation is a version of the artifact store (see
+artifacts.py). When ``TrainModel.trainModel()`` publishes a new version the
+registry notices the changed manifest and swaps in a freshly loaded bundle;
+requests already running keep the bundle they started with.
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse
+import torch
+
+from .Prediction import Prediction
+from .stemmer import MODEL_DIR
+from .artifacts import ARTIFACTS, current_version, iter_artifacts
+
+CHECK_INTERVAL = float(os.getenv("MODEL_REGISTRY_CHECK_INTERVAL", "5"))
+
+
+def read_generation():
+    return current_version()
+
+
+def estimate_size(obj, _seen=None):
+    """Best-effort resident size of a loaded artifact in bytes.
+
+    Counts tensor and ndarray buffers by their real size and walks containers,
+    instance dicts and ``__getstate__`` (which is how sklearn's Cython trees
+    expose their node arrays).
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, torch.nn.Module):
+        tensors = list(obj.parameters()) + list(obj.buffers())
+        return sum(t.element_size() * t.nelement() for t in tensors)
+    if isinstance(obj, torch.Tensor):
+        return obj.element_size() * obj.nelement()
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if scipy.sparse.issparse(obj):
+        return sum(int(getattr(obj, name).nbytes) for name in ("data", "indices", "indptr", "row", "col")
+                   if isinstance(getattr(obj, name, None), np.ndarray))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, _seen) + estimate_size(v, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += estimate_size(v, _seen)
+    elif isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        pass
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), _seen)
+    else:
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = None
+        if state is not None and state is not obj:
+            size += estimate_size(state, _seen)
+    return size
+
+
+def artifact_size(obj):
+    # Size accounting is informational and must never fail a model load.
+    try:
+        return estimate_size(obj)
+    except Exception as e:
+        print(f"[ModelRegistry] Could not size {type(obj).__name__}: {e}")
+        return 0
+
+
+class ModelBundle:
+    """One immutable, fully loaded generation of the models."""
+
+    def __init__(self, generation, predictor, stats):
+        self.generation = generation
+        self.predictor = predictor
+        self.stats = stats
+        self.loaded_at = datetime.now()
+
+    @classmethod
+    def load(cls, generation):
+        stats = {}
+        loaded = {}
+        started = time.perf_counter()
+        for name, obj, path in iter_artifacts(generation):
+            loaded[name] = obj
+            stats[name] = {
+                "load_seconds": round(time.perf_counter() - started, 4),
+                "file_bytes": os.path.getsize(path),
+                "path": os.path.relpath(path, MODEL_DIR),
+                "size_bytes": artifact_size(obj),
+            }
+            started = time.perf_counter()
+
+        started = time.perf_counter()
+        predictor = Prediction(*(loaded[name] for name in ARTIFACTS))
+        stats["dictionaries"] = {
+            "load_seconds": round(time.perf_counter() - started, 4),
+            "file_bytes": sum(
+                os.path.getsize(os.path.join(MODEL_DIR, f)) for f in ("dict.txt", "suf.txt")
+            ),
+            "size_bytes": artifact_size(predictor.words) + artifact_size(predictor.suf),
+        }
+        return cls(generation, predictor, stats)
+
+
+class ModelRegistry:
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._bundle = None
+        self._last_check = 0.0
+        self._load_lock = threading.Lock()
+
+    def current(self):
+        """Return the bundle for the newest published generation.
+
+        The fast path is a plain attribute read; the artifact store's
+        manifest is consulted at most once per ``check_interval`` seconds.
+        """
+        bundle = self._bundle
+        now = time.monotonic()
+        if bundle is not None and now - self._last_check < self.check_interval:
+            return bundle
+
+        self._last_check = now
+        generation = read_generation()
+        if bundle is not None and bundle.generation == generation:
+            return bundle
+        return self._swap(generation)
+
+    def reload(self):
+        return self._swap(read_generation(), force=True)
+
+    def _swap(self, generation, force=False):
+        with self._load_lock:
+            bundle = self._bundle
+            if bundle is not None and bundle.generation == generation and not force:
+                return bundle
+            try:
+                new_bundle = ModelBundle.load(generation)
+            except Exception as e:
+                if bundle is None:
+                    raise
+                print(f"[ModelRegistry] Could not load generation {generation}, keeping {bundle.generation}: {e}")
+                return bundle
+            self._bundle = new_bundle
+            print(f"[ModelRegistry] Loaded model generation {generation}")
+            return new_bundle
+
+    def stats(self):
+        bundle = self._bundle
+        if bundle is None:
+            return {"generation": None, "artifacts": {}}
+        return {
+            "generation": bundle.generation,
+            "loaded_at": bundle.loaded_at.isoformat(),
+            "pid": os.getpid(),
+            "artifacts": bundle.stats,
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,114 @@
+"""
+Cache of prediction scores in front of AuthenticityChecker.check.
+
+Entries are keyed by a fingerprint of the normalized, stemmed text plus the
+model generation, so a retrain that publishes a new generation invalidates
+everything without any explicit flush. The in-process store is a bounded LRU
+with a TTL; when settings.PREDICTION_CACHE_ALIAS names a Django cache
+(memcached, redis, database...) it is used as a second level shared by all
+workers.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def fingerprint(normalized_text, generation):
+    digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+    return f"pred:{generation}:{digest}"
+
+
+class ResultCache:
+    def __init__(self, maxsize=10000, ttl=3600, shared_alias=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self._store = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _switch_generation(self, generation):
+        # Keys of an older generation can never be hit again; drop them now
+        # rather than waiting for the LRU to push them out.
+        if generation != self._generation:
+            self._store.clear()
+            self._generation = generation
+
+    def get(self, text_fingerprint, generation):
+        now = time.monotonic()
+        with self._lock:
+            self._switch_generation(generation)
+            entry = self._store.get(text_fingerprint)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._store.move_to_end(text_fingerprint)
+                    self.hits += 1
+                    return value
+                del self._store[text_fingerprint]
+
+        shared = self._shared()
+        value = shared.get(text_fingerprint) if shared is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._put(text_fingerprint, value, now)
+        return value
+
+    def set(self, text_fingerprint, generation, value):
+        with self._lock:
+            self._switch_generation(generation)
+            self._put(text_fingerprint, value, time.monotonic())
+        shared = self._shared()
+        if shared is not None:
+            shared.set(text_fingerprint, value, self.ttl)
+
+    def _put(self, key, value, now):
+        self._store[key] = (now + self.ttl, value)
+        self._store.move_to_end(key)
+        while len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "generation": self._generation,
+                "size": len(self._store),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "shared_alias": self.shared_alias,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    maxsize=getattr(settings, "PREDICTION_CACHE_SIZE", 10000),
+                    ttl=getattr(settings, "PREDICTION_CACHE_TTL", 3600),
+                    shared_alias=getattr(settings, "PREDICTION_CACHE_ALIAS", None) or None,
+                )
+    return _result_cache
@@ -0,0 +1,91 @@
+"""
+Suffix-stripping stemmer used by Prediction.
+
+The dictionary is held in a set and the suffix list is compiled once into a
+reversed trie, so stemming a token costs O(longest suffix) instead of a scan
+of the 36k-word dictionary plus a regex compile. The output is identical to
+the original regex implementation:
+
+    re.sub(r'(\\s*)(' + '|'.join(suffixes) + r')$', r' \\2', token)
+
+i.e. the longest suffix ending the token (or ending just before a single
+trailing newline, as ``$`` allows) is split off, together with any whitespace
+directly in front of it, and the remaining head is stemmed again.
+"""
+import os
+from functools import lru_cache
+
+MODEL_DIR = os.path.dirname(__file__)
+
+_END = ""  # trie key marking the end of a suffix; real keys are single chars
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8-sig") as s:
+        return s.read().split("\n")
+
+
+class Stemmer:
+    def __init__(self, words, suffixes):
+        self.words = frozenset(words)
+        self.suffixes = frozenset(suffixes)
+        self.trie = {}
+        for suffix in self.suffixes:
+            node = self.trie
+            for ch in reversed(suffix):
+                node = node.setdefault(ch, {})
+            node[_END] = True
+
+    @classmethod
+    def from_files(cls, dict_path, suf_path):
+        return cls(read_lines(dict_path), read_lines(suf_path))
+
+    def split_suffix(self, token):
+        """Return (head, suffix) for the longest matching suffix, or None.
+
+        ``suffix`` keeps a trailing newline of the token, ``head`` loses the
+        whitespace run that separated it from the suffix.
+        """
+        end = len(token) - 1 if token.endswith("\n") else len(token)
+        node = self.trie
+        start = None
+        i = end
+        while i > 0:
+            node = node.get(token[i - 1])
+            if node is None:
+                break
+            i -= 1
+            if _END in node:
+                start = i
+        if start is None:
+            return None
+
+        head_end = start
+        while head_end > 0 and token[head_end - 1].isspace():
+            head_end -= 1
+        return token[:head_end], token[start:]
+
+    def stem(self, text):
+        if text in self.suffixes:
+            return text
+
+        w = []
+        for t in text.split(" "):
+            if t in self.words:
+                w.append(t)
+                continue
+            split = self.split_suffix(t)
+            if split is None:
+                w.append(t)
+            else:
+                w.append(self.stem(split[0]) + " " + split[1])
+        return " ".join(w)
+
+
+@lru_cache(maxsize=None)
+def default_stemmer():
+    """Stemmer for the bundled dict.txt/suf.txt, loaded once per process."""
+    return Stemmer.from_files(
+        os.path.join(MODEL_DIR, "dict.txt"),
+        os.path.join(MODEL_DIR, "suf.txt"),
+    )
@@ -1,47 +1,132 @@
-import pickle
+import time
+from datetime import datetime, timedelta
 from .Prediction import Prediction
-from .Prediction import FakeNewsLSTM
-import pandas as pd
-import torch,os
+from .ensemble import peak_memory_mb
+from . import feature_cache
+from .artifacts import current_version, iter_artifacts, publish, read_metadata
+import os
 import pandas as pd
+from django.db.models import Count, Q
+from sklearn.linear_model import SGDClassifier
 from Main.models import News
+
+# TRAINING_MODE=incremental only feeds the rows added since the last run to
+# the models; a full rebuild still happens every TRAINING_FULL_REBUILD_DAYS
+# days, when no earlier run is recorded, or when the artifacts on disk can't
+# be updated in place. TRAINING_MODE=full refits everything every time.
+TRAINING_MODE = os.getenv("TRAINING_MODE", "incremental")
+FULL_REBUILD_DAYS = int(os.getenv("TRAINING_FULL_REBUILD_DAYS", "7"))
+FINETUNE_EPOCHS = int(os.getenv("TRAINING_FINETUNE_EPOCHS", "2"))
+FINETUNE_LR = float(os.getenv("TRAINING_FINETUNE_LR", "0.0001"))
+# Rows fetched per database round trip while extracting the training set.
+CHUNK_SIZE = int(os.getenv("TRAINING_CHUNK_SIZE", "2000"))
+
+
+def online_linear_models():
+    """partial_fit-capable stand-ins for the linear members (LR and the SVM
+    OC), so later incremental runs can update them."""
+    return {
+        "LR": SGDClassifier(loss="log_loss", random_state=0),
+        "OC": SGDClassifier(loss="hinge", random_state=0),
+    }
+
+
+def stream_frame(querysets, chunk_size=CHUNK_SIZE):
+    """One id/text/class DataFrame from (queryset, class) pairs.
+
+    Rows are streamed with a server-side cursor into column lists, and the
+    frame is built once at the end.
+    """
+    ids, texts, labels = [], [], []
+    start = time.perf_counter()
+    for queryset, label in querysets:
+        for news_id, text in queryset.values_list('id', 'description').iterator(chunk_size=chunk_size):
+            ids.append(news_id)
+            texts.append(text)
+            labels.append(label)
+    df = pd.DataFrame({"id": ids, "text": texts, "class": labels})
+    elapsed = time.perf_counter() - start
+    peak = peak_memory_mb()
+    print(f"Loaded {len(df)} rows in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/sec), "
+          f"process peak memory {'n/a' if peak is None else f'{peak:.0f} MB'}")
+    return df
+
+
+def cached_features(df, pp):
+    """Token streams for df's rows from the feature cache, or None when
+    TRAINING_FEATURE_CACHE=0."""
+    if not feature_cache.ENABLED:
+        return None
+    return feature_cache.FeatureCache().sync(df["id"], df["text"], pp)
+
+
 class TrainModel:
     def __init__(self) -> None:
         pass
+
+    def load_predictor(self, version):
+        loaded = [obj for name, obj, path in iter_artifacts(version, trainable=True)]
+        return Prediction(*loaded)
+
+    def needs_full_rebuild(self, state, pp):
+        if TRAINING_MODE != "incremental":
+            return True
+        if "last_full_build" not in state or "last_news_id" not in state:
+            return True
+        if datetime.now() - datetime.fromisoformat(state["last_full_build"]) >= timedelta(days=FULL_REBUILD_DAYS):
+            return True
+        return not pp.supports_incremental()
+
     def trainModel(self):
-        df=pd.DataFrame()
-        numfake=News.objects.filter(isfake=True).count()
-        numreal=numfake 
-        count=0
-        for data in News.objects.filter(isfake=False):
-            temp = pd.DataFrame([[data.description,1]], columns=["text", "class"])
-            df=pd.concat([df,temp])
-            count+=1
-            if numreal<=count:
-                break
-        count=0
-        for data in News.objects.filter(isfake=True):
-            temp = pd.DataFrame([[data.description,0]], columns=["text", "class"])
-            df=pd.concat([df,temp])
-            count+=1
-            if numfake<=count:
-                break
-        for data in News.objects.all():
-            print(data.description)
-        with open(os.path.dirname(__file__) + '\\RF.pkl', 'rb') as f:
-            RF = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\GB.pkl', 'rb') as f:
-            GB = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\LR.pkl', 'rb') as f:
-            LR = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\OC.pkl', 'rb') as f:
-            OC = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\vect.pkl', 'rb') as f:
-            vect = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\PT.pkl', 'rb') as f:
-            pt = pickle.load(f)
-        with open(os.path.dirname(__file__) + '\\vocab.pkl', 'rb') as f:
-            vocab = pickle.load(f)
-
-        pp = Prediction(OC, LR, GB, RF,pt, vect, vocab)
-        pp.fit(df)
+        version = current_version()
+        # What the last run trained on travels with the artifacts it wrote.
+        state = read_metadata(version).get("training", {})
+        pp = self.load_predictor(version)
+        last_news_id = News.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        if self.needs_full_rebuild(state, pp):
+            rows = self.fullRebuild(pp)
+            state = {"mode": "full", "last_full_build": datetime.now().isoformat()}
+        else:
+            rows = self.incrementalUpdate(pp, state["last_news_id"], last_news_id)
+            if not rows:
+                return
+            state = dict(state, mode="incremental", last_incremental=datetime.now().isoformat())
+
+        state["last_news_id"] = last_news_id
+        version = pp.save_models({"training_rows": rows, "parent": version, "training": state})
+        # Workers pick up the new version on their next registry check.
+        publish(version)
+
+    def incrementalUpdate(self, pp, after_id, upto_id):
+        new_rows = News.objects.filter(id__gt=after_id, id__lte=upto_id)
+        df = stream_frame([
+            (new_rows.filter(isfake=False), 1),
+            (new_rows.filter(isfake=True), 0),
+        ])
+        if df.empty or df["class"].nunique() < 2:
+            print(f"Incremental training skipped, {len(df)} new rows")
+            return 0
+        print(f"Incremental training on {len(df)} new rows")
+        pp.fit_incremental(df, lstm_epochs=FINETUNE_EPOCHS, lstm_lr=FINETUNE_LR,
+                           features=cached_features(df, pp))
+        return len(df)
+
+    def fullRebuild(self, pp):
+        # Balanced classes: the same number of real and fake rows, picked
+        # by the database with LIMIT rather than by counting in Python.
+        counts = News.objects.aggregate(
+            real=Count('id', filter=Q(isfake=False)),
+            fake=Count('id', filter=Q(isfake=True)),
+        )
+        per_class = min(counts['real'], counts['fake'])
+        df = stream_frame([
+            (News.objects.filter(isfake=False).order_by('id')[:per_class], 1),
+            (News.objects.filter(isfake=True).order_by('id')[:per_class], 0),
+        ])
+
+        if TRAINING_MODE == "incremental":
+            for name, model in online_linear_models().items():
+                setattr(pp, name, model)
+        pp.fit(df, features=cached_features(df, pp))
+        return len(df)
@@ -0,0 +1,58 @@
+"""
+NumPy-backed encoding and padding for the LSTM input.
+
+The vocab artifact stays a plain {token: id} dict: str hashing dominates any
+lookup, and the dict's C hash table beat a pandas Index in
+benchmarks/vocab_benchmark.py. What changes is where the ids go. VocabIndex
+streams them with np.fromiter straight into one preallocated int64 buffer per
+batch, so there are no per-text Python lists. pad_batch() fills a
+preallocated matrix that torch.from_numpy() wraps without copying. int64 is
+what nn.Embedding and pack_padded_sequence take, so there is no conversion
+later either.
+"""
+from itertools import accumulate, chain, repeat
+
+import numpy as np
+import torch
+
+
+class VocabIndex:
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.get = vocab.get
+        self.unk = vocab["<UNK>"]
+
+    def encode(self, tokens):
+        """Token ids of one token list, as an int64 array."""
+        return np.fromiter(map(self.get, tokens, repeat(self.unk)), dtype=np.int64, count=len(tokens))
+
+    def encode_many(self, tokenized_texts):
+        """Token ids of every token list in one buffer; returns one array
+        view per text."""
+        tokenized_texts = list(tokenized_texts)
+        if len(tokenized_texts) == 1:
+            return [self.encode(tokenized_texts[0])]
+        ends = list(accumulate(len(tokens) for tokens in tokenized_texts))
+        ids = np.fromiter(map(self.get, chain.from_iterable(tokenized_texts), repeat(self.unk)),
+                          dtype=np.int64, count=ends[-1] if ends else 0)
+        starts = [0] + ends[:-1]
+        return [ids[start:end] for start, end in zip(starts, ends)]
+
+
+def pad_batch(sequences, width=None):
+    """Pad to the longest sequence in the batch (or cut/pad to ``width``);
+    returns (ids, lengths) tensors sharing memory with NumPy buffers.
+
+    Empty sequences are scored as a single <PAD> token because packing
+    needs a length of at least one.
+    """
+    lengths = [max(len(seq), 1) for seq in sequences]
+    if width:
+        lengths = [min(length, width) for length in lengths]
+    else:
+        width = max(lengths, default=1)
+    padded = np.zeros((len(sequences), width), dtype=np.int64)
+    for row, seq, length in zip(padded, sequences, lengths):
+        if len(seq):
+            row[:length] = seq[:length]
+    return torch.from_numpy(padded), torch.from_numpy(np.array(lengths, dtype=np.int64))
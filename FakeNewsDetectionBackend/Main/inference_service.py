@@ -0,0 +1,298 @@
+"""
+Local inference service.
+
+When settings.INFERENCE_SERVICE_SOCKET is set, web workers don't load any
+models: ``get_checker()`` returns an InferenceClient that sends each text
+over a Unix socket to the service started with
+
+    python manage.py run_inference_service
+
+The service owns a pool of INFERENCE_WORKERS processes, each with its own
+model registry (the artifacts are memory-mapped, so the pages are shared).
+Requests arriving within INFERENCE_BATCH_WAIT_MS of each other are grouped
+into batches of up to INFERENCE_BATCH_SIZE texts and scored with one
+AuthenticityChecker.check_many() call. Once INFERENCE_MAX_QUEUE texts are
+waiting or being scored, new requests are rejected immediately and the
+client raises InferenceBusy.
+
+Without a socket configured, get_checker() returns an in-process
+AuthenticityChecker as before. Async views use ``acheck()``, which talks to
+the service without blocking the event loop, or runs the in-process checker
+on a pool of INFERENCE_THREADS threads.
+
+The protocol is one JSON object per line in each direction:
+{"op": "check", "text": ...} -> {"score": ...} or {"error": ...},
+{"op": "check_many", "texts": [...]} -> {"scores": [...]} or {"error": ...},
+and {"op": "stats"} -> the service counters.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class InferenceError(Exception):
+    pass
+
+
+class InferenceBusy(InferenceError):
+    pass
+
+
+class InferenceUnavailable(InferenceError):
+    pass
+
+
+def _init_worker(torch_threads):
+    import django
+    django.setup()
+    import torch
+    torch.set_num_threads(torch_threads)
+    from .TrainingModel.registry import registry
+    registry.current()
+
+
+def score_batch(texts):
+    from .TrainingModel.AuthenticityChecker import AuthenticityChecker
+    return AuthenticityChecker().check_many(texts)
+
+
+class MicroBatcher:
+    def __init__(self, executor, max_batch, max_wait_ms, max_queue):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.queue = asyncio.Queue()
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+        self.batches = 0
+
+    async def submit(self, text):
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise InferenceBusy("inference queue is full")
+        self.pending += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        try:
+            return await future
+        finally:
+            self.pending -= 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Keep collecting while this batch is scored; the pool's size
+            # limits how many batches actually run at once.
+            loop.create_task(self.dispatch(batch))
+
+    async def dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            scores = await loop.run_in_executor(self.executor, score_batch, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(InferenceError(str(e)))
+            return
+        self.batches += 1
+        self.served += len(batch)
+        for (_, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(score)
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "served": self.served,
+            "batches": self.batches,
+            "avg_batch": round(self.served / self.batches, 2) if self.batches else 0,
+            "rejected": self.rejected,
+        }
+
+
+class InferenceServer:
+    def __init__(self, path, workers, max_batch, max_wait_ms, max_queue):
+        self.path = path
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "stats":
+                        response = self.batcher.stats()
+                    elif request.get("op") == "check_many":
+                        # Each text joins the micro-batches on its own, so
+                        # the queue limit applies per text.
+                        scores = await asyncio.gather(
+                            *(self.batcher.submit(text) for text in request["texts"]), return_exceptions=True)
+                        for score in scores:
+                            if isinstance(score, Exception):
+                                raise score
+                        response = {"scores": scores}
+                    else:
+                        response = {"score": await self.batcher.submit(request["text"])}
+                except InferenceBusy as e:
+                    response = {"error": "busy", "detail": str(e)}
+                except Exception as e:
+                    response = {"error": "failed", "detail": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn rather than fork: the workers start torch's thread pools.
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(torch_threads,),
+        )
+        self.batcher = MicroBatcher(executor, self.max_batch, self.max_wait_ms, self.max_queue)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        print(f"[InferenceService] Listening on {self.path} with {self.workers} workers")
+        try:
+            async with server:
+                await asyncio.gather(server.serve_forever(), self.batcher.run())
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+class InferenceClient:
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+
+    def request(self, payload):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as f:
+                    line = f.readline()
+        except OSError as e:
+            raise InferenceUnavailable(f"inference service at {self.path}: {e}")
+        return self.parse(line)
+
+    async def arequest(self, payload):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.path), self.timeout)
+            try:
+                writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+            finally:
+                writer.close()
+        except (OSError, asyncio.TimeoutError) as e:
+            raise InferenceUnavailable(f"inference service at {self.path}: {e!r}")
+        return self.parse(line)
+
+    def parse(self, line):
+        if not line:
+            raise InferenceUnavailable(f"inference service at {self.path} closed the connection")
+        response = json.loads(line)
+        if response.get("error") == "busy":
+            raise InferenceBusy(response.get("detail", "busy"))
+        if "error" in response:
+            raise InferenceError(response.get("detail", response["error"]))
+        return response
+
+    def check(self, text):
+        return self.request({"op": "check", "text": text})["score"]
+
+    async def acheck(self, text):
+        return (await self.arequest({"op": "check", "text": text}))["score"]
+
+    def check_many(self, texts):
+        return self.request({"op": "check_many", "texts": list(texts)})["scores"]
+
+    async def acheck_many(self, texts):
+        return (await self.arequest({"op": "check_many", "texts": list(texts)}))["scores"]
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+
+def service_client():
+    """The InferenceClient when a service socket is configured, else None."""
+    path = getattr(settings, "INFERENCE_SERVICE_SOCKET", "")
+    if path:
+        return InferenceClient(path, getattr(settings, "INFERENCE_SERVICE_TIMEOUT", 10))
+    return None
+
+
+def get_checker():
+    """Something with a check(text) method returning the percentage score."""
+    client = service_client()
+    if client:
+        return client
+    from .TrainingModel.AuthenticityChecker import AuthenticityChecker
+    return AuthenticityChecker()
+
+
+_thread_pool = None
+
+
+def inference_threads():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, "INFERENCE_THREADS", 2), thread_name_prefix="inference")
+    return _thread_pool
+
+
+def _check_in_process(text):
+    return get_checker().check(text)
+
+
+def _check_many_in_process(texts):
+    return get_checker().check_many(texts)
+
+
+async def acheck(text):
+    """check(text) for async views."""
+    client = service_client()
+    if client:
+        return await client.acheck(text)
+    # Building the in-process checker loads the models on first use, so it
+    # happens on the pool too, never on the event loop.
+    return await asyncio.get_running_loop().run_in_executor(inference_threads(), _check_in_process, text)
+
+
+async def acheck_many(texts):
+    """check_many(texts) for async views; one batched model run."""
+    if not texts:
+        return []
+    client = service_client()
+    if client:
+        return await client.acheck_many(texts)
+    return await asyncio.get_running_loop().run_in_executor(inference_threads(), _check_many_in_process, texts)
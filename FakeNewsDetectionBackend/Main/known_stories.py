@@ -0,0 +1,121 @@
+"""
+Full-text lookup of stories that are already in the News corpus.
+
+News.search_vector (title weighted A, description weighted B, "simple"
+config since PostgreSQL ships no Nepali dictionary) is filled by one bulk
+UPDATE for every row that doesn't have a vector yet; the daily scrape runs it
+after inserting, and migration 0007 backfills existing rows. Code that edits
+a title or description should reset search_vector to None.
+
+Before the models run, perform_fake_news_check asks find_known_story() for
+the best full-text candidates (GIN index + ts_rank) and accepts one only if
+the text is near-identical to its title or description, in which case the
+stored label is returned instead of a model score.
+
+A near-copy contains nearly all of the text's words, so the query ANDs the
+KNOWN_STORY_QUERY_TERMS longest (and so rarest) terms of the text, OR the
+same for its purified form. That keeps the GIN match to a handful of rows;
+at most KNOWN_STORY_MAX_MATCHES of them are ranked. The synthetic
+Generated-Fake rows are never candidates.
+"""
+import difflib
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+
+from .models import News
+
+SEARCH_CONFIG = "simple"
+# plainto_tsquery ignores punctuation itself; this only splits words.
+TERM_RE = re.compile(r'[^\s"\-()]+')
+
+
+def news_search_vector():
+    return (SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="B", config=SEARCH_CONFIG))
+
+
+def update_search_vectors(queryset=None):
+    """Fill search_vector where it is missing; returns the number of rows."""
+    if connection.vendor != "postgresql":
+        return 0
+    queryset = News.objects.all() if queryset is None else queryset
+    return queryset.filter(search_vector__isnull=True).update(search_vector=news_search_vector())
+
+
+def query_terms(text, limit):
+    """The ``limit`` longest distinct terms of ``text``."""
+    terms = list(dict.fromkeys(TERM_RE.findall(text.lower())))
+    return sorted(terms, key=len, reverse=True)[:limit]
+
+
+def known_story_query(*texts):
+    """All selected terms of one of ``texts``, or None if they have none."""
+    limit = getattr(settings, "KNOWN_STORY_QUERY_TERMS", 8)
+    query = None
+    for text in texts:
+        terms = query_terms(text, limit)
+        if terms:
+            part = SearchQuery(" ".join(terms), search_type="plain", config=SEARCH_CONFIG)
+            query = part if query is None else query | part
+    return query
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    matcher = difflib.SequenceMatcher(None, a, b)
+    # The cheap upper bounds rule most candidates out before ratio().
+    if matcher.real_quick_ratio() < 0.5 or matcher.quick_ratio() < 0.5:
+        return 0.0
+    return matcher.ratio()
+
+
+def find_known_story(text, purified=""):
+    """The stored story ``text`` is a near-copy of, or None.
+
+    ``purified`` is the text run through Prediction.getPurified, which is
+    how scraped descriptions are stored.
+    """
+    if not getattr(settings, "KNOWN_STORY_LOOKUP", True) or connection.vendor != "postgresql":
+        return None
+    query = known_story_query(text, purified)
+    if query is None:
+        return None
+
+    matches = (
+        News.objects.filter(search_vector=query)
+        .exclude(source=News.GENERATED_SOURCE)
+        .values("id")[:getattr(settings, "KNOWN_STORY_MAX_MATCHES", 200)]
+    )
+    candidates = (
+        News.objects.filter(id__in=matches)
+        .annotate(rank=SearchRank("search_vector", query))
+        .order_by("-rank")
+        .only("id", "title", "description", "source", "isfake", "meta_data")
+        [:getattr(settings, "KNOWN_STORY_CANDIDATES", 5)]
+    )
+
+    min_similarity = getattr(settings, "KNOWN_STORY_MIN_SIMILARITY", 0.9)
+    best, best_score = None, 0.0
+    for news in candidates:
+        score = max(
+            similarity(text, news.title or ""),
+            similarity(text, news.description),
+            similarity(purified, news.description),
+        )
+        if score > best_score:
+            best, best_score = news, score
+    if best is None or best_score < min_similarity:
+        return None
+
+    return {
+        "id": best.id,
+        "title": best.title,
+        "source": best.source,
+        "original_url": best.meta_data.get("original_url"),
+        "isfake": best.isfake,
+        "similarity": round(best_score, 4),
+    }
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Main.scheduler import scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the daily scrape-and-retrain job, once or as a long-running worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true",
+                            help="keep running and start the job whenever a new day begins")
+        parser.add_argument("--interval", type=int, default=300,
+                            help="seconds between checks in --loop mode (default 300)")
+
+    def handle(self, *args, **options):
+        while True:
+            if scheduler.is_due():
+                ran = scheduler.run_if_due()
+                self.stdout.write("Daily scrape finished." if ran else "Daily scrape not needed or already running.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,31 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Main.inference_service import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Serve model inference for the web workers over INFERENCE_SERVICE_SOCKET."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.INFERENCE_SERVICE_SOCKET,
+                            help="Unix socket path (default INFERENCE_SERVICE_SOCKET)")
+        parser.add_argument("--workers", type=int, default=settings.INFERENCE_WORKERS,
+                            help="inference processes (default INFERENCE_WORKERS)")
+
+    def handle(self, *args, **options):
+        if not options["socket"]:
+            raise CommandError("Set INFERENCE_SERVICE_SOCKET or pass --socket.")
+        server = InferenceServer(
+            options["socket"],
+            workers=options["workers"],
+            max_batch=settings.INFERENCE_BATCH_SIZE,
+            max_wait_ms=settings.INFERENCE_BATCH_WAIT_MS,
+            max_queue=settings.INFERENCE_MAX_QUEUE,
+        )
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,23 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    News = apps.get_model("Main", "News")
+    News.objects.filter(search_vector__isnull=True).update(
+        search_vector=SearchVector("title", weight="A", config="simple")
+        + SearchVector("description", weight="B", config="simple")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0006_alter_userquerylog_prediction_label'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0007_populate_news_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=django.contrib.postgres.indexes.HashIndex(fields=['title'], name='Main_news_title_hash'),
+        ),
+    ]
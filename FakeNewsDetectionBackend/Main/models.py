@@ -5,7 +5,7 @@ import hashlib
 # POSTGRES-SPECIFIC IMPORTS 
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.search import SearchVectorField
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GinIndex, HashIndex
 
 class Feedback(models.Model):
     user = models.ForeignKey(User, related_name="feedbacks", on_delete=models.CASCADE)
@@ -17,6 +17,9 @@ class ReportIssue(models.Model):
     message = models.TextField()
 
 class News(models.Model):
+    # Source of the synthetic fake rows the daily scrape adds for training.
+    GENERATED_SOURCE = "Generated-Fake"
+
     # Added title for better indexing
     title = models.CharField(max_length=500, blank=True, null=True)
     description = models.TextField() # The main text content
@@ -29,6 +32,8 @@ class News(models.Model):
     class Meta:
         indexes = [
             GinIndex(fields=['search_vector']),
+            # Equality lookups of scraped titles during ingestion.
+            HashIndex(fields=['title'], name='Main_news_title_hash'),
         ]
 
     def __str__(self) -> str:
@@ -0,0 +1,136 @@
+"""
+Asynchronous, batched writer for UserQueryLog.
+
+Request threads only build an unsaved UserQueryLog and hand it to an
+in-process queue; a background thread writes the queue out with bulk_create
+every QUERY_LOG_BATCH_SIZE records or every QUERY_LOG_FLUSH_MS
+milliseconds, whichever comes first. The queue is bounded by
+QUERY_LOG_MAX_PENDING. When it is full QUERY_LOG_OVERFLOW decides what
+happens: "drop" discards the record (and counts it), "block" makes the
+request wait up to QUERY_LOG_BLOCK_SECONDS for room before dropping. Calls
+made on an event loop (the async views) never block, since that would stall
+every request the loop serves; for them a full queue always drops.
+Pending records are flushed when the process exits.
+
+Timestamps are filled in by ``auto_now_add`` at flush time, so they can lag
+the request by up to one flush interval.
+"""
+import asyncio
+import atexit
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import UserQueryLog
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class QueryLogWriter:
+    def __init__(self, batch_size=100, flush_ms=500, max_pending=10000, overflow="drop", block_seconds=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.overflow = overflow
+        self.block_seconds = block_seconds
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def log(self, **fields):
+        self._ensure_started()
+        record = UserQueryLog(**fields)
+        try:
+            if self.overflow == "block" and not on_event_loop():
+                self._queue.put(record, timeout=self.block_seconds)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or self._stop.is_set():
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                self._drain(batch)
+            if batch:
+                self._write(batch)
+        self.flush()
+        connection.close()
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            UserQueryLog.objects.bulk_create(batch, batch_size=self.batch_size)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"[QueryLogWriter] Failed to write {len(batch)} query logs: {e}")
+
+    def flush(self):
+        """Write out everything that is queued right now."""
+        while True:
+            batch = self._drain([])
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+query_log_writer = QueryLogWriter(
+    batch_size=getattr(settings, "QUERY_LOG_BATCH_SIZE", 100),
+    flush_ms=getattr(settings, "QUERY_LOG_FLUSH_MS", 500),
+    max_pending=getattr(settings, "QUERY_LOG_MAX_PENDING", 10000),
+    overflow=getattr(settings, "QUERY_LOG_OVERFLOW", "drop"),
+    block_seconds=getattr(settings, "QUERY_LOG_BLOCK_SECONDS", 0.05),
+)
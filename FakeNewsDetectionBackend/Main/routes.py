@@ -1,4 +1,4 @@
-from .views import MainPage,ReportIssuePage,FeedbackPage,ResultForExtension,ResultPage,GetReviews,Download
+from .views import MainPage,ReportIssuePage,FeedbackPage,ResultForExtension,ResultForExtensionBatch,ResultPage,GetReviews,Download,ModelStatus
 from django.urls import path
  
 urlpatterns = [
@@ -9,5 +9,7 @@ urlpatterns = [
     path("download/",Download,name="download"),
     path("getReviews",GetReviews,name="reviews"),
     path("tos",ResultPage,name="tos"),
-    path("search_for_extension", ResultForExtension,name="e_result")
+    path("search_for_extension", ResultForExtension,name="e_result"),
+    path("search_for_extension_batch", ResultForExtensionBatch,name="e_batch_result"),
+    path("model_status", ModelStatus,name="model_status")
 ]
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Daily scrape-and-retrain job.
+
+The job normally runs in its own process (``manage.py run_daily_scrape
+--loop``). Web workers can still start it when SCRAPER_RUN_IN_WEB is on,
+but the "has today's scrape happened?" check they do on every page view is
+a date comparison in memory; the database is only consulted from the
+background thread, at most once per day and process.
+
+Only one worker may run the job at a time. On PostgreSQL this uses a
+session-level advisory lock; other databases fall back to an exclusive lock
+file (SCRAPER_LOCK_FILE).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .known_stories import update_search_vectors
+from .models import News, TodaysNews
+
+ADVISORY_LOCK_KEY = 7_301_946  # arbitrary, identifies the daily scrape job
+RETRY_AFTER_SECONDS = 15 * 60
+STALE_LOCK_SECONDS = 6 * 60 * 60
+
+
+@contextmanager
+def job_lock():
+    """Yield True if this process may run the job, False if another holds it."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [ADVISORY_LOCK_KEY])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [ADVISORY_LOCK_KEY])
+        return
+
+    path = str(settings.SCRAPER_LOCK_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        yield False
+        return
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield True
+    finally:
+        os.remove(path)
+
+
+TITLE_LOOKUP_CHUNK = 1000
+
+
+def existing_titles(titles):
+    """{title: id} for the titles already stored, in a few IN queries."""
+    found = {}
+    titles = list(titles)
+    for i in range(0, len(titles), TITLE_LOOKUP_CHUNK):
+        chunk = titles[i:i + TITLE_LOOKUP_CHUNK]
+        found.update(News.objects.filter(title__in=chunk).values_list('title', 'id'))
+    return found
+
+
+def ingest(items, todays, predictor, fake_desc):
+    """Store scraped items that aren't in News yet, each with its synthetic
+    fake counterpart, and link every scraped story to today's headlines.
+    Returns the number of new stories."""
+    unique = {}
+    for item in items:
+        unique.setdefault(item.title, item)
+    known = existing_titles(unique)
+
+    scraped_at = str(timezone.now())
+    new_items = [item for title, item in unique.items() if title not in known]
+    real = [
+        News(
+            title=item.title,
+            description=predictor.getPurified(item.description),
+            source=item.source,
+            isfake=False,
+            meta_data={"original_url": item.source, "scraped_at": scraped_at}
+        )
+        for item in new_items
+    ]
+    fake = [
+        News(
+            title="Fake: " + item.title,
+            description=fake_desc,
+            source=News.GENERATED_SOURCE,
+            isfake=True
+        )
+        for item in new_items
+    ]
+    with transaction.atomic():
+        real = News.objects.bulk_create(real, batch_size=500)
+        News.objects.bulk_create(fake, batch_size=500)
+        headline_ids = list(known.values()) + [news.id for news in real]
+        Headline = TodaysNews.headlines.through
+        Headline.objects.bulk_create(
+            [Headline(todaysnews_id=todays.id, news_id=news_id) for news_id in headline_ids],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+    return len(real)
+
+
+def scrape_and_train():
+    # Imported here so web workers that never run the job don't load
+    # Selenium or the training stack.
+    from .webscrapper import WebScrapper
+    from .TrainingModel.Prediction import Prediction
+    from .TrainingModel.trainer import TrainModel
+
+    print("Scraper started")
+    todays = TodaysNews.objects.create()
+
+    scrapper = WebScrapper()
+    predictor = Prediction()
+
+    fake_news_sample = News.objects.filter(isfake=True).order_by('?').first()
+    fake_desc = fake_news_sample.description if fake_news_sample else "Fake news placeholder"
+
+    added = ingest(scrapper.lists, todays, predictor, fake_desc)
+    print(f"Stored {added} new stories out of {len(scrapper.lists)} scraped")
+    print(f"Indexed {update_search_vectors()} news rows for full-text lookup")
+
+    TrainModel().trainModel()
+    print("Model Trained")
+
+
+class DailyScrapeScheduler:
+    def __init__(self):
+        self._done_for = None
+        self._next_attempt = 0.0
+        self._running = threading.Lock()
+
+    def is_due(self):
+        return self._done_for != datetime.today().date() and time.monotonic() >= self._next_attempt
+
+    def run_if_due(self):
+        """Run the job in the calling thread; returns True if it ran."""
+        if not self._running.acquire(blocking=False):
+            return False
+        try:
+            close_old_connections()
+            today = datetime.today().date()
+            if TodaysNews.objects.filter(date=today).exists():
+                self._done_for = today
+                return False
+            with job_lock() as acquired:
+                if not acquired:
+                    # Another worker is on it; look again later.
+                    self._next_attempt = time.monotonic() + RETRY_AFTER_SECONDS
+                    return False
+                if TodaysNews.objects.filter(date=today).exists():
+                    self._done_for = today
+                    return False
+                scrape_and_train()
+                self._done_for = today
+                return True
+        except Exception as e:
+            print(f"Error in background scraper: {e}")
+            self._next_attempt = time.monotonic() + RETRY_AFTER_SECONDS
+            return False
+        finally:
+            self._running.release()
+            close_old_connections()
+
+    def trigger_if_due(self):
+        """Page-view hook: start the job in a background thread if it may be due."""
+        if not getattr(settings, "SCRAPER_RUN_IN_WEB", True) or not self.is_due():
+            return
+        # Don't let every concurrent page view spawn a thread while the first
+        # one is still checking.
+        self._next_attempt = time.monotonic() + RETRY_AFTER_SECONDS
+        threading.Thread(target=self.run_if_due, daemon=True).start()
+
+
+scheduler = DailyScrapeScheduler()
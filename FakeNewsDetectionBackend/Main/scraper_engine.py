@@ -0,0 +1,211 @@
+"""
+Concurrent HTTP scraper engine.
+
+Article pages are fetched with aiohttp over a shared connection pool, with
+a per-host rate limit, retries with exponential backoff and timeouts, and
+parsed as static HTML with BeautifulSoup (lxml when it is installed). The
+Selenium scrapers in webscrapper.py are only used as a fallback when a
+source's static HTML yields nothing, i.e. when the page really needs JS.
+
+Every source takes its base URL as an argument, so the whole pipeline can be
+pointed at a local HTTP server serving recorded pages.
+"""
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+MAX_CONCURRENCY = 16
+PER_HOST_RATE = 8.0  # requests per second
+RETRIES = 3
+TIMEOUT_SECONDS = 15
+USER_AGENT = "Mozilla/5.0 (compatible; NewsAuthenticityBot/1.0)"
+
+
+class HostRateLimiter:
+    """Spaces out request start times per host to at most ``rate`` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class FetchEngine:
+    def __init__(self, concurrency=MAX_CONCURRENCY, per_host_rate=PER_HOST_RATE,
+                 retries=RETRIES, timeout=TIMEOUT_SECONDS):
+        self.concurrency = concurrency
+        self.per_host_rate = per_host_rate
+        self.retries = retries
+        self.timeout = timeout
+        self.session = None
+        self.limiter = None
+        self.requests = 0
+        self.failures = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": USER_AGENT},
+        )
+        self.limiter = HostRateLimiter(self.per_host_rate)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def fetch(self, url):
+        """Body of ``url`` as text, or None for 4xx pages and exhausted retries."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            await self.limiter.wait(host)
+            self.requests += 1
+            try:
+                async with self.session.get(url) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status)
+                    if response.status >= 400:
+                        return None
+                    return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    self.failures += 1
+                    print(f"[Engine] Giving up on {url}: {e!r}")
+                    return None
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def fetch_all(self, urls):
+        pages = await asyncio.gather(*(self.fetch(url) for url in urls))
+        return dict(zip(urls, pages))
+
+
+def parse_annapurna_latest_id(html):
+    soup = BeautifulSoup(html, HTML_PARSER)
+    first = soup.find("div", attrs={"class": "breaking__news"}).find("a")
+    return int(first["href"].split("/")[2])
+
+
+def parse_annapurna_story(html, url):
+    from .webscrapper import Data
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    heading_tag = soup.find('h1', class_='news__title')
+    if not heading_tag:
+        return None
+    details_div = soup.find('div', class_='news__details')
+    subheadings = [p.get_text(strip=True) for p in details_div.find_all('p')] if details_div else []
+
+    data = Data()
+    data.source = url
+    data.title = heading_tag.get_text(strip=True)
+    data.description = "\n".join(subheadings) if subheadings else "No Subheadings Found"
+    return data
+
+
+def parse_kantipur_listing(html, url, limit):
+    from .webscrapper import Data
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    items = []
+    for h2, p in zip(soup.find_all('h2'), soup.find_all('p')):
+        if len(items) >= limit:
+            break
+        heading = h2.get_text(strip=True)
+        if not heading:
+            continue
+        anchor = h2.find("a")
+        data = Data()
+        data.title = heading
+        data.description = p.get_text(strip=True)
+        data.source = url + anchor['href'] if anchor and anchor.get('href') else url
+        items.append(data)
+    return items
+
+
+class AnnapurnaSource:
+    name = "Annapurna"
+
+    def __init__(self, url="https://www.annapurnapost.com/", limit=30, default_latest_id=469175):
+        self.url = url.rstrip("/") + "/"
+        self.limit = limit
+        self.default_latest_id = default_latest_id
+
+    async def collect(self, engine):
+        latest_id = self.default_latest_id
+        home = await engine.fetch(self.url)
+        try:
+            latest_id = parse_annapurna_latest_id(home)
+        except Exception as e:
+            print(f"[Annapurna] Could not detect ID automatically (Error: {e}). Using default: {latest_id}")
+
+        urls = [f"{self.url}story/{story_id}/" for story_id in range(latest_id - self.limit, latest_id + 1)]
+        pages = await engine.fetch_all(urls)
+        items = []
+        for url in urls:
+            if pages[url]:
+                data = parse_annapurna_story(pages[url], url)
+                if data is not None:
+                    items.append(data)
+        return items
+
+    def selenium_fallback(self):
+        from .webscrapper import Annapurna
+        return Annapurna(self.url).lists
+
+
+class KantipurSource:
+    name = "Kantipur"
+
+    def __init__(self, url="https://ekantipur.com/news", limit=30):
+        self.url = url
+        self.limit = limit
+
+    async def collect(self, engine):
+        html = await engine.fetch(self.url)
+        return parse_kantipur_listing(html, self.url, self.limit) if html else []
+
+    def selenium_fallback(self):
+        from .webscrapper import Kantipur
+        return Kantipur(self.url).lists
+
+
+async def collect_sources(sources, engine_options=None):
+    async with FetchEngine(**(engine_options or {})) as engine:
+        results = await asyncio.gather(*(source.collect(engine) for source in sources), return_exceptions=True)
+    collected = {}
+    for source, result in zip(sources, results):
+        if isinstance(result, Exception):
+            print(f"[{source.name}] Error: {result!r}")
+            result = []
+        collected[source.name] = result
+    return collected
+
+
+def scrape(sources, selenium_fallback=True, engine_options=None):
+    """Collect every source concurrently; returns {source name: [Data, ...]}."""
+    collected = asyncio.run(collect_sources(sources, engine_options))
+    for source in sources:
+        print(f"[{source.name}] Collected {len(collected[source.name])} articles over HTTP")
+        if not collected[source.name] and selenium_fallback:
+            print(f"[{source.name}] Static HTML had no articles, falling back to Selenium")
+            collected[source.name] = source.selenium_fallback()
+    return collected
@@ -1,3 +1,1073 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pandas as pd
+import torch
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.svm import LinearSVC
+
+from . import inference_service, scheduler as daily_scrape, views
+from .TrainingModel import artifacts, ensemble, lstm_trainer, trainer
+from .TrainingModel.Prediction import FakeNewsLSTM, Prediction
+from .TrainingModel.feature_cache import FeatureCache, fit_transform_tokens
+from .TrainingModel.normalizer import _REMOVED_CLASSES, clean_devanagari, purify, remove_characters, tokenize_document
+from .TrainingModel.registry import ModelRegistry
+from .TrainingModel.result_cache import ResultCache, fingerprint
+from .TrainingModel.stemmer import Stemmer, default_stemmer
+from .TrainingModel.vocab import VocabIndex, pad_batch
+from .known_stories import update_search_vectors
+from .models import News, TodaysNews, UserQueryLog
+from .querylog import QueryLogWriter
+from .scraper_engine import AnnapurnaSource, KantipurSource, scrape
+from .title_index import TitleIndex
+from .translation import LocalBackend, TranslationService, get_translation_service
+from .views import BatchRequestError, parse_batch_items
+from .webscrapper import Data
+
+# Trimmed copies of the markup the scrapers rely on.
+PAGES = {
+    "/annapurna/": '<div class="breaking__news"><a href="/story/1002/">x</a></div>',
+    "/annapurna/story/1000/": '<h1 class="news__title">पहिलो समाचार</h1>'
+                              '<div class="news__details"><p>अनुच्छेद एक</p><p>अनुच्छेद दुई</p></div>',
+    "/annapurna/story/1002/": '<h1 class="news__title">तेस्रो समाचार</h1>',
+    "/kantipur/news": '<h2><a href="/a">शीर्षक एक</a></h2><p>विवरण एक</p>'
+                      '<h2><a href="/b">शीर्षक दुई</a></h2><p>विवरण दुई</p>',
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # story 1001 fails once with a 500 to exercise the retry path
+    flaky = {"/annapurna/story/1001/": 1}
+
+    def do_GET(self):
+        if self.flaky.get(self.path):
+            self.flaky[self.path] -= 1
+            self.send_response(500)
+            self.end_headers()
+            return
+        if self.path == "/annapurna/story/1001/":
+            body = '<h1 class="news__title">दोस्रो समाचार</h1>'
+        else:
+            body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class ScraperEngineTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_collects_sources_from_static_pages(self):
+        sources = [
+            AnnapurnaSource(self.base + "/annapurna/", limit=3),
+            KantipurSource(self.base + "/kantipur/news", limit=30),
+        ]
+        collected = scrape(sources, selenium_fallback=False, engine_options={"retries": 2})
+
+        annapurna = collected["Annapurna"]
+        self.assertEqual([d.title for d in annapurna], ["पहिलो समाचार", "दोस्रो समाचार", "तेस्रो समाचार"])
+        self.assertEqual(annapurna[0].description, "अनुच्छेद एक\nअनुच्छेद दुई")
+        self.assertEqual(annapurna[2].description, "No Subheadings Found")
+
+        kantipur = collected["Kantipur"]
+        self.assertEqual([d.title for d in kantipur], ["शीर्षक एक", "शीर्षक दुई"])
+        self.assertEqual(kantipur[1].source, self.base + "/kantipur/news/b")
+
+
+def make_data(title):
+    data = Data()
+    data.title = title
+    return data
+
+
+class TitleIndexTests(SimpleTestCase):
+    def test_keeps_each_corroborated_story_once(self):
+        index = TitleIndex()
+        index.add_source("Annapurna", [make_data("संसद बैठक आज बस्दै"), make_data("मौसम सफा रहने")])
+        index.add_source("Kantipur", [make_data("सरकारले बजेट ल्यायो"), make_data("संसद बैठक आज बस्दै छ")])
+        index.add_source("Setopati", [make_data("मौसम सफा रहने अनुमान"), make_data("संसद बैठक आज बस्दै रे")])
+
+        titles = [d.title for d in index.corroborated(threshold=0.5, prefer="Kantipur")]
+        # Kantipur's title where it has the story, otherwise the first one.
+        self.assertEqual(titles, ["मौसम सफा रहने", "संसद बैठक आज बस्दै छ"])
+
+    def test_never_pairs_titles_from_the_same_source(self):
+        index = TitleIndex()
+        index.add_source("Kantipur", [make_data("एउटै शीर्षक"), make_data("एउटै शीर्षक")])
+        self.assertEqual(index.corroborated(), [])
+
+    def test_short_titles_are_compared_without_the_shingle_filter(self):
+        # One shared trigram each, but matchNews is well above 0.5.
+        pairs = [("हिमपात", "हिउँपात"), ("हडताल", "हड्ताल")]
+        for short_title, expected in ((0, []), (8, ["हिमपात", "हडताल"])):
+            index = TitleIndex(short_title=short_title)
+            index.add_source("Annapurna", [make_data("हिउँपात"), make_data("हड्ताल")])
+            index.add_source("Kantipur", [make_data(a) for a, _ in pairs])
+            titles = [d.title for d in index.corroborated(threshold=0.5, prefer="Kantipur")]
+            self.assertEqual(titles, expected)
+
+
+@override_settings(BATCH_CHECK_MAX_ITEMS=3, BATCH_CHECK_MAX_CHARS=10)
+class BatchItemsTests(SimpleTestCase):
+    def test_accepts_strings_and_objects(self):
+        items = parse_batch_items({"items": ["पहिलो", {"id": "h2", "content": "दोस्रो"}]})
+        self.assertEqual(items, [(None, "पहिलो"), ("h2", "दोस्रो")])
+
+    def test_rejects_bad_batches(self):
+        for data, status in [
+            ({}, 400),
+            ({"items": []}, 400),
+            ({"items": ["a", {"id": 1}]}, 400),
+            ({"items": ["a", "b", "c", "d"]}, 413),
+            ({"items": ["x" * 11]}, 413),
+        ]:
+            with self.assertRaises(BatchRequestError) as ctx:
+                parse_batch_items(data)
+            self.assertEqual(ctx.exception.status, status)
+
+
+class CountingPredictor:
+    def __init__(self):
+        self.vect = TfidfVectorizer()
+        self.tokenized = []
+
+    def analyze_text(self, text):
+        self.tokenized.append(text)
+        return self.vect.build_analyzer()(text), text.split()
+
+
+class FeatureCacheTests(SimpleTestCase):
+    def test_only_new_or_changed_articles_are_processed(self):
+        pp = CountingPredictor()
+        with tempfile.TemporaryDirectory() as path:
+            cache = FeatureCache(path)
+            cache.sync([1, 2], ["संसद बैठक", "बजेट आयो"], pp)
+            features = cache.sync([3, 2, 1], ["नयाँ खबर", "बजेट फेरियो", "संसद बैठक"], pp)
+
+        self.assertEqual(pp.tokenized, ["संसद बैठक", "बजेट आयो", "नयाँ खबर", "बजेट फेरियो"])
+        self.assertEqual(features.lstm_docs(), [["नयाँ", "खबर"], ["बजेट", "फेरियो"], ["संसद", "बैठक"]])
+
+    def test_cached_terms_give_the_same_tfidf_matrix(self):
+        texts = ["सरकार आज बैठक", "आज को खबर", "खबर खबर सरकार"]
+        pp = CountingPredictor()
+        with tempfile.TemporaryDirectory() as path:
+            features = FeatureCache(path).sync([1, 2, 3], texts, pp)
+            cached = fit_transform_tokens(pp.vect, features.tfidf_docs())
+
+        direct = TfidfVectorizer().fit_transform(texts)
+        self.assertEqual(abs(cached - direct).max(), 0)
+        self.assertEqual(pp.vect.transform(texts).shape, direct.shape)
+
+
+def legacy_stem(words, suf, text):
+    """The regex stemmer Stemmer replaced, verbatim."""
+    if text in suf:
+        return text
+    w = []
+    for t in text.split(" "):
+        if t not in words:
+            pattern = r'(\s*)(' + '|'.join(map(re.escape, suf)) + r')$'
+            modified_text = re.sub(pattern, r' \2', t)
+            if len(modified_text.split(" ")) > 1:
+                modified_text = legacy_stem(words, suf, modified_text.split(" ")[0]) + " " + modified_text.split(" ")[1]
+            w.append(modified_text)
+        else:
+            w.append(t)
+    return " ".join(w)
+
+
+def legacy_remove_characters(text):
+    """removeCharacters() as a chain of re.sub calls over the same classes."""
+    for chars in _REMOVED_CLASSES:
+        text = re.sub("[" + chars + "]+", "", text)
+    return re.sub(r"[ \t]+", " ", text).strip()
+
+
+class StemmerTests(SimpleTestCase):
+    def test_matches_the_regex_stemmer(self):
+        words, suf = ["घर", "नेपाल"], ["मा", "हरू", "हरूमा", "को", "ले"]
+        stemmer = Stemmer(words, suf)
+        for text in ["घरहरूमा", "नेपालको", "केटाहरूले", "मा", "घर", "किताब\n", "सहरको\n", "", "ab  को", "केटाले र"]:
+            self.assertEqual(stemmer.stem(text), legacy_stem(words, suf, text), text)
+
+    def test_bundled_dictionary_matches_the_regex_stemmer(self):
+        stemmer = default_stemmer()
+        words, suf = list(stemmer.words), list(stemmer.suffixes)
+        text = "नेपालको सरकारले आज संसदमा बजेट प्रस्तुत गर्‍यो र विद्यार्थीहरूलाई छात्रवृत्ति दिने घोषणा गर्‍यो"
+        self.assertEqual(stemmer.stem(text), legacy_stem(words, suf, text))
+
+
+class RemoveCharactersTests(SimpleTestCase):
+    def test_matches_the_regex_chain(self):
+        texts = [
+            "नेपाल\tसरकार  abc ÀÉ 한국 😀 ।",
+            "\ufeffसमाचार\u200b आज\xa0बिहान",
+            "  Breaking:  २०८१ साल  ",
+            "Привет मित्र שלום عالم ಕನ್ನಡ ☺",
+            "\t\t",
+            "",
+        ]
+        texts.append("".join(_REMOVED_CLASSES) + " बाँकी")
+        for text in texts:
+            self.assertEqual(remove_characters(text), legacy_remove_characters(text), repr(text))
+
+
+class TokenizeDocumentTests(SimpleTestCase):
+    def test_matches_the_separate_tfidf_and_lstm_tokenizers(self):
+        analyzer = TfidfVectorizer().build_analyzer()
+        for text in ["नेपाल सरकार, आज।", "Breaking: संसद 2081 बैठक", "क।ख  ग-घ", "।", "", "ABC def"]:
+            lstm = re.findall(r"[\u0900-\u097F]+", clean_devanagari(text))
+            self.assertEqual(tokenize_document(text), (analyzer(text), lstm))
+
+
+class VocabIndexTests(SimpleTestCase):
+    vocab = {"<PAD>": 0, "<UNK>": 1, "नेपाल": 2, "सरकार": 3}
+
+    def test_encodes_like_dict_lookup(self):
+        texts = [["नेपाल", "नयाँ", "सरकार"], [], ["सरकार"]]
+        encoded = VocabIndex(self.vocab).encode_many(texts)
+        self.assertEqual([seq.tolist() for seq in encoded], [[2, 1, 3], [], [3]])
+
+    def test_pads_into_int64_tensors(self):
+        ids, lengths = pad_batch(VocabIndex(self.vocab).encode_many([["नेपाल", "सरकार"], []]))
+        self.assertEqual(ids.tolist(), [[2, 3], [0, 0]])
+        self.assertEqual(lengths.tolist(), [2, 1])
+        self.assertEqual(ids.dtype, torch.int64)
+        self.assertEqual(pad_batch([[5, 6, 7]], width=2)[0].tolist(), [[5, 6]])
+
+
+TRAINING_TEXTS = ["नेपाल सरकार बैठक", "सरकार बजेट ल्यायो", "झुटो खबर फैलियो", "नक्कली समाचार फैलियो"]
+TRAINING_LABELS = [1, 1, 0, 0]
+
+
+def make_predictor(online=False):
+    """A tiny, fully fitted Prediction with the same artifact types as the
+    shipped models; ``online`` uses the SGD stand-ins a full rebuild installs
+    for LR and OC."""
+    texts, labels = TRAINING_TEXTS, TRAINING_LABELS
+    vect = TfidfVectorizer()
+    v = vect.fit_transform(texts)
+    members = {
+        "OC": LinearSVC(),
+        "LR": LogisticRegression(),
+        "GB": GradientBoostingClassifier(n_estimators=5),
+        "RF": RandomForestClassifier(n_estimators=5),
+    }
+    if online:
+        members.update(trainer.online_linear_models())
+    pp = Prediction(vect=vect, **{name: model.fit(v, labels) for name, model in members.items()})
+    pp.vocab = pp.build_vocab([pp.tokenize(t) for t in texts])
+    pp.pt = FakeNewsLSTM(len(pp.vocab), 8, 8, 1, 1, False, 0.0)
+    pp.pt.packed = True
+    return pp
+
+
+def artifact_store(path):
+    return mock.patch.multiple(artifacts, STORE_DIR=path, MANIFEST_FILE=os.path.join(path, "manifest.json"))
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def test_loads_a_published_generation(self):
+        with tempfile.TemporaryDirectory() as store, artifact_store(store):
+            version = artifacts.publish(artifacts.write_version(make_predictor()))
+            bundle = ModelRegistry(check_interval=0).current()
+            scores = bundle.predictor.predict_many(["नेपाल सरकार बैठक", "झुटो खबर"])
+
+        self.assertEqual(bundle.generation, version)
+        self.assertGreater(bundle.stats["vect"]["size_bytes"], 0)
+        self.assertEqual(len(scores), 2)
+
+    def test_checksum_mismatch_keeps_the_loaded_generation(self):
+        with tempfile.TemporaryDirectory() as store, artifact_store(store):
+            good = artifacts.publish(artifacts.write_version(make_predictor(), version="v1"))
+            registry = ModelRegistry(check_interval=0)
+            registry.current()
+            bad = artifacts.publish(artifacts.write_version(make_predictor(), version="v2"))
+            with open(os.path.join(store, bad, "vect.joblib"), "ab") as f:
+                f.write(b"corrupt")
+
+            with self.assertRaisesRegex(artifacts.ArtifactError, "vect.joblib"):
+                list(artifacts.iter_artifacts(bad))
+            self.assertEqual(registry.current().generation, good)
+            with self.assertRaises(artifacts.ArtifactError):
+                ModelRegistry(check_interval=0).current()
+
+    def test_rollback_restores_the_previous_manifest_entry(self):
+        with tempfile.TemporaryDirectory() as store, artifact_store(store):
+            for version in ("v1", "v2"):
+                artifacts.publish(artifacts.write_version(make_predictor(), version=version))
+            registry = ModelRegistry(check_interval=0)
+            self.assertEqual(registry.current().generation, "v2")
+
+            self.assertEqual(artifacts.rollback(), "v1")
+            manifest = artifacts.read_manifest()
+            self.assertEqual(registry.current().generation, "v1")
+
+            with self.assertRaises(artifacts.ArtifactError):
+                artifacts.rollback()
+
+        self.assertEqual(manifest["history"], ["v1"])
+        self.assertEqual(manifest["rolled_back_from"], "v2")
+
+    def test_publish_prunes_versions_beyond_keep(self):
+        with tempfile.TemporaryDirectory() as store, artifact_store(store), \
+                mock.patch.object(artifacts, "KEEP_VERSIONS", 2):
+            predictor = make_predictor()
+            for version in ("v1", "v2", "v3"):
+                artifacts.publish(artifacts.write_version(predictor, version=version))
+            os.makedirs(os.path.join(store, "v4.partial"))
+            artifacts.publish("v3")
+            entries = sorted(e for e in os.listdir(store) if os.path.isdir(os.path.join(store, e)))
+            manifest = artifacts.read_manifest()
+
+        self.assertEqual(entries, ["v2", "v3", "v4.partial"])
+        self.assertEqual(manifest["current"], "v3")
+        self.assertEqual(manifest["history"], ["v3", "v2"])
+
+    def test_int8_export_round_trips_within_tolerance(self):
+        pp = make_predictor()
+        torch.manual_seed(0)
+        pp.pt = FakeNewsLSTM(len(pp.vocab), 16, 32, 1, 1, False, 0.0)
+        pp.pt.packed = True
+        generator = torch.Generator().manual_seed(1)
+        sequences = [torch.randint(1, len(pp.vocab), (n,), generator=generator).tolist() for n in (3, 9, 20, 40)]
+        float_scores = pp.score_sequences(sequences)
+
+        with tempfile.TemporaryDirectory() as store, artifact_store(store), \
+                mock.patch.object(artifacts, "QUANTIZE", True):
+            version = artifacts.write_version(pp)
+            metadata = artifacts.read_metadata(version)
+            pp.pt, path = artifacts.load_versioned_lstm(version, metadata)
+            int8_scores = pp.score_sequences(sequences)
+
+        self.assertEqual(sorted(metadata["artifacts"]["PT"]["files"]), ["PT.int8.ts", "PT.json", "PT.pt", "PT.ts"])
+        self.assertEqual(os.path.basename(path), "PT.int8.ts")
+        self.assertIsInstance(pp.pt, torch.jit.ScriptModule)
+        self.assertGreater(max(float_scores) - min(float_scores), 0.01)
+        for expected, actual in zip(float_scores, int8_scores):
+            self.assertAlmostEqual(actual, expected, delta=0.005)
+
+
+def hold_memory(mb=64, seconds=0.3):
+    """Overlap task that keeps ``mb`` of touched memory for a few RSS samples."""
+    block = b"x" * (mb * 1024 * 1024)
+    time.sleep(seconds)
+    return len(block) // (1024 * 1024)
+
+
+class FitMembersTests(SimpleTestCase):
+    def setUp(self):
+        self.v = TfidfVectorizer().fit_transform(TRAINING_TEXTS)
+        self.members = {"LR": LogisticRegression(), "OC": LinearSVC()}
+
+    def fit(self, parallel, overlap=hold_memory):
+        with mock.patch.object(ensemble, "PARALLEL", parallel):
+            return ensemble.fit_members(self.members, self.v, TRAINING_LABELS, overlap=overlap)
+
+    def test_sequential_report(self):
+        fitted, reports, held = self.fit(parallel=False)
+
+        self.assertEqual(held, 64)
+        self.assertEqual(sorted(reports), ["LR", "OC", "overlap"])
+        for report in reports.values():
+            self.assertEqual(report["pid"], os.getpid())
+            self.assertGreaterEqual(report["wall_seconds"], 0)
+            self.assertGreaterEqual(report["cpu_seconds"], 0)
+            self.assertGreaterEqual(report["peak_rss_mb"], report["rss_growth_mb"])
+        self.assertGreaterEqual(reports["overlap"]["wall_seconds"], 0.3)
+        self.assertGreater(reports["overlap"]["rss_growth_mb"], 48)
+        self.assertEqual(len(fitted["LR"].predict(self.v)), len(TRAINING_LABELS))
+
+    def test_members_fit_in_worker_processes_while_overlap_runs_here(self):
+        fitted, reports, _ = self.fit(parallel=True)
+
+        self.assertEqual(reports["overlap"]["pid"], os.getpid())
+        for name in ("LR", "OC"):
+            self.assertNotEqual(reports[name]["pid"], os.getpid())
+            self.assertIn("rss_growth_mb", reports[name])
+            self.assertEqual(len(fitted[name].predict(self.v)), len(TRAINING_LABELS))
+
+    def test_falls_back_to_the_process_peak_without_proc(self):
+        with mock.patch.object(ensemble, "current_rss_mb", return_value=None):
+            _, reports, _ = self.fit(parallel=False, overlap=lambda: None)
+        self.assertNotIn("rss_growth_mb", reports["overlap"])
+        self.assertGreater(reports["overlap"]["process_peak_rss_mb"], 0)
+
+
+def sliding_window(**overrides):
+    values = dict(LSTM_SLIDING_WINDOW=True, LSTM_WINDOW=10, LSTM_STRIDE=5, LSTM_AGGREGATE="mean")
+    return mock.patch.multiple("Main.TrainingModel.Prediction", **dict(values, **overrides))
+
+
+class SlidingWindowTests(SimpleTestCase):
+    def setUp(self):
+        self.pp = make_predictor()
+        torch.manual_seed(0)
+        self.pp.pt = FakeNewsLSTM(len(self.pp.vocab), 16, 32, 1, 1, False, 0.0)
+        self.pp.pt.packed = True
+        generator = torch.Generator().manual_seed(2)
+        self.short = torch.randint(1, len(self.pp.vocab), (8,), generator=generator).tolist()
+        self.long = torch.randint(1, len(self.pp.vocab), (23,), generator=generator).tolist()
+
+    def test_short_text_scores_as_a_single_window(self):
+        with sliding_window(LSTM_SLIDING_WINDOW=False):
+            single = self.pp.score_sequences([self.short])
+        with sliding_window():
+            windowed = self.pp.score_sequences([self.short])
+        self.assertAlmostEqual(windowed[0], single[0], places=6)
+
+    def test_long_text_aggregates_its_window_scores(self):
+        # Windows start every 5 tokens, the last one flush with the end.
+        windows = [self.long[start:start + 10] for start in (0, 5, 10, 13)]
+        with sliding_window():
+            self.assertEqual(self.pp.lstm_windows(self.long), windows)
+            window_scores = self.pp.score_sequences(windows)
+            mean = self.pp.score_sequences([self.long])[0]
+        with sliding_window(LSTM_AGGREGATE="max"):
+            highest = self.pp.score_sequences([self.long])[0]
+        with sliding_window(LSTM_SLIDING_WINDOW=False):
+            truncated = self.pp.score_sequences([self.long])[0]
+
+        self.assertAlmostEqual(mean, sum(window_scores) / len(window_scores), places=6)
+        self.assertAlmostEqual(highest, max(window_scores), places=6)
+        self.assertAlmostEqual(truncated, window_scores[0], places=6)
+        self.assertNotAlmostEqual(mean, truncated, places=4)
+
+
+def score_lengths(texts):
+    return [len(text) for text in texts]
+
+
+class InferenceServiceTests(SimpleTestCase):
+    def round_trip(self, *requests, max_queue=10):
+        """Answers of a real server/client pair on a temporary socket, with
+        the models replaced by score_lengths."""
+        async def run(path):
+            server = inference_service.InferenceServer(path, 1, max_batch=4, max_wait_ms=5, max_queue=max_queue)
+            server.batcher = inference_service.MicroBatcher(executor, 4, 5, max_queue)
+            listener = await asyncio.start_unix_server(server.handle, path=path)
+            batching = asyncio.ensure_future(server.batcher.run())
+            client = inference_service.InferenceClient(path, timeout=5)
+            try:
+                return [await request(client) for request in requests], server.batcher.stats()
+            finally:
+                # Let the handlers see the client hang up before shutting down.
+                await asyncio.sleep(0.05)
+                batching.cancel()
+                listener.close()
+                await listener.wait_closed()
+
+        with tempfile.TemporaryDirectory() as directory, ThreadPoolExecutor(1) as executor, \
+                mock.patch.object(inference_service, "score_batch", score_lengths):
+            return asyncio.run(run(os.path.join(directory, "inference.sock")))
+
+    def test_scores_single_and_batched_requests(self):
+        answers, stats = self.round_trip(
+            lambda client: client.acheck("नेपाल"),
+            lambda client: client.acheck_many(["क", "खग", "घङच"]),
+        )
+        self.assertEqual(answers, [5, [1, 2, 3]])
+        self.assertEqual(stats["served"], 4)
+        self.assertEqual(stats["rejected"], 0)
+
+    def test_rejects_texts_beyond_the_queue_limit(self):
+        with self.assertRaises(inference_service.InferenceBusy):
+            self.round_trip(lambda client: client.acheck_many(["क", "ख"]), max_queue=1)
+
+
+SHARED_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+    "shared": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+}
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_new_generation_invalidates_entries(self):
+        cache = ResultCache(maxsize=10, ttl=60)
+        key = fingerprint("नेपाल सरकार", "g1")
+        cache.set(key, "g1", 87.5)
+
+        self.assertEqual(cache.get(key, "g1"), 87.5)
+        self.assertIsNone(cache.get(fingerprint("नेपाल सरकार", "g2"), "g2"))
+        # Switching back doesn't resurrect the old generation's entries.
+        self.assertIsNone(cache.get(key, "g1"))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 0))
+        self.assertEqual(stats["hit_rate"], round(1 / 3, 4))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_second_worker_hits_the_shared_level(self):
+        key = fingerprint("नेपाल सरकार", "g1")
+        ResultCache(shared_alias="shared").set(key, "g1", 12.0)
+        other = ResultCache(shared_alias="shared")
+
+        self.assertEqual(other.get(key, "g1"), 12.0)
+        self.assertEqual(other.get(key, "g1"), 12.0)
+        self.assertEqual((other.stats()["shared_hits"], other.stats()["hits"]), (1, 1))
+
+
+def log_fields(i):
+    return {"user_hash": "h", "query_text": f"समाचार {i}", "prediction_score": 50.0, "prediction_label": "REAL"}
+
+
+class QueryLogWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.batches = []
+        patcher = mock.patch.object(UserQueryLog.objects, "bulk_create",
+                                    side_effect=lambda batch, **kwargs: self.batches.append(list(batch)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writes_in_batches(self):
+        writer = QueryLogWriter(batch_size=3, flush_ms=20)
+        for i in range(7):
+            writer.log(**log_fields(i))
+        writer.stop()
+
+        self.assertEqual(sorted(r.query_text for batch in self.batches for r in batch),
+                         sorted(log_fields(i)["query_text"] for i in range(7)))
+        self.assertLessEqual(max(len(batch) for batch in self.batches), 3)
+        self.assertEqual(writer.stats()["written"], 7)
+
+    def test_flushes_a_partial_batch_after_the_interval(self):
+        writer = QueryLogWriter(batch_size=100, flush_ms=20)
+        self.addCleanup(writer.stop)
+        writer.log(**log_fields(0))
+        deadline = time.monotonic() + 2
+        while not writer.written and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([len(batch) for batch in self.batches], [1])
+
+    def full_writer(self, overflow):
+        # No writer thread: the queue only fills up.
+        writer = QueryLogWriter(max_pending=2, overflow=overflow, block_seconds=0.2)
+        writer._ensure_started = lambda: None
+        writer.log(**log_fields(0))
+        writer.log(**log_fields(1))
+        return writer
+
+    def test_drop_policy_counts_overflow(self):
+        writer = self.full_writer("drop")
+        writer.log(**log_fields(2))
+        self.assertEqual((writer.stats()["pending"], writer.stats()["dropped"]), (2, 1))
+
+    def test_block_policy_waits_only_off_the_event_loop(self):
+        writer = self.full_writer("block")
+        started = time.monotonic()
+        writer.log(**log_fields(2))
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        async def log_from_view():
+            started = time.monotonic()
+            writer.log(**log_fields(3))
+            return time.monotonic() - started
+
+        self.assertLess(asyncio.run(log_from_view()), 0.2)
+        self.assertEqual(writer.stats()["dropped"], 2)
+
+
+class FakeAdvisoryLocks:
+    """A connection whose cursor implements pg_try_advisory_lock/unlock."""
+    vendor = "postgresql"
+
+    def __init__(self):
+        self.held = set()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params):
+        with self.lock:
+            if "pg_try_advisory_lock" in sql:
+                self.result = params[0] not in self.held
+                self.held.add(params[0])
+            elif "pg_advisory_unlock" in sql:
+                self.held.discard(params[0])
+
+    def fetchone(self):
+        return (self.result,)
+
+
+class DailyScrapeSchedulerTests(SimpleTestCase):
+    def test_is_due_once_per_day_and_after_the_retry_delay(self):
+        scheduler = daily_scrape.DailyScrapeScheduler()
+        self.assertTrue(scheduler.is_due())
+        scheduler._next_attempt = time.monotonic() + 60
+        self.assertFalse(scheduler.is_due())
+        scheduler._next_attempt = 0.0
+        scheduler._done_for = datetime.today().date()
+        self.assertFalse(scheduler.is_due())
+
+    def run_two_workers(self, connection):
+        """Start the job in one scheduler and try it from a second one while
+        the first is still running; returns (runs, first, second)."""
+        started, release, runs = threading.Event(), threading.Event(), []
+
+        def job():
+            runs.append(threading.current_thread().name)
+            started.set()
+            release.wait(5)
+
+        first, second = daily_scrape.DailyScrapeScheduler(), daily_scrape.DailyScrapeScheduler()
+        with mock.patch.object(daily_scrape, "connection", connection), \
+                mock.patch.object(daily_scrape, "scrape_and_train", job), \
+                mock.patch.object(daily_scrape, "close_old_connections"), \
+                mock.patch.object(TodaysNews.objects, "filter") as todays:
+            todays.return_value.exists.return_value = False
+            worker = threading.Thread(target=first.run_if_due, name="first")
+            worker.start()
+            self.assertTrue(started.wait(5))
+            self.assertFalse(second.run_if_due())
+            release.set()
+            worker.join(5)
+        return runs, first, second
+
+    def test_advisory_lock_lets_one_worker_run(self):
+        locks = FakeAdvisoryLocks()
+        runs, first, second = self.run_two_workers(locks)
+
+        self.assertEqual(runs, ["first"])
+        self.assertFalse(first.is_due())
+        # The second worker backs off for RETRY_AFTER_SECONDS.
+        self.assertFalse(second.is_due())
+        self.assertEqual(locks.held, set())
+
+    def test_lock_file_lets_one_worker_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            lock_file = os.path.join(directory, "scraper.lock")
+            with override_settings(SCRAPER_LOCK_FILE=lock_file):
+                runs, _, _ = self.run_two_workers(mock.Mock(vendor="sqlite"))
+            self.assertEqual(runs, ["first"])
+            self.assertFalse(os.path.exists(lock_file))
+
+
+def scraped(title, url):
+    data = make_data(title)
+    data.description = "विवरण " + title
+    data.source = url
+    return data
+
+
+class PassthroughPurifier:
+    def getPurified(self, text):
+        return text
+
+
+class IngestTests(TestCase):
+    def test_stores_each_new_title_once(self):
+        old = News.objects.create(title="पुरानो समाचार", description="पुरानो", source="https://a/1")
+        todays = TodaysNews.objects.create()
+        items = [
+            scraped("पुरानो समाचार", "https://b/1"),
+            scraped("नयाँ समाचार", "https://a/2"),
+            scraped("नयाँ समाचार", "https://b/2"),
+        ]
+
+        added = daily_scrape.ingest(items, todays, PassthroughPurifier(), "नक्कली विवरण")
+
+        self.assertEqual(added, 1)
+        new = News.objects.get(title="नयाँ समाचार")
+        self.assertEqual(new.source, "https://a/2")
+        self.assertEqual(News.objects.filter(source=News.GENERATED_SOURCE).count(), 1)
+        self.assertEqual(set(todays.headlines.values_list("id", flat=True)), {old.id, new.id})
+
+    def test_title_lookup_uses_the_title_hash_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            daily_scrape.existing_titles(["पुरानो समाचार", "नयाँ समाचार"])
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cursor:
+            # A handful of rows would always be scanned; ask what the
+            # planner does once that isn't the cheap option.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + queries[0]["sql"])
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        self.assertIn("Main_news_title_hash", plan)
+
+
+KNOWN_STORY = ("काठमाडौं महानगरपालिकाले भोलिदेखि सार्वजनिक यातायातमा विद्युतीय बसहरू सञ्चालन गर्ने "
+               "निर्णय गरेको छ र यात्रुहरूका लागि नयाँ भाडादर पनि तोकिएको छ")
+
+
+@override_settings(TRANSLATION_BACKEND="local", KNOWN_STORY_LOOKUP=True)
+class KnownStoryTests(TestCase):
+    def setUp(self):
+        # Stored the way the daily scrape stores descriptions.
+        self.story = News.objects.create(title="विद्युतीय बस सञ्चालन", description=purify(KNOWN_STORY),
+                                         source="https://kantipur/1", isfake=True)
+        News.objects.create(title="विद्युतीय बस सञ्चालन", description=purify(KNOWN_STORY),
+                            source=News.GENERATED_SOURCE, isfake=False)
+        update_search_vectors()
+
+    def check(self, text, score=80.0):
+        """perform_fake_news_check with the models replaced by ``score``;
+        returns its result and the model mock."""
+        acheck = mock.AsyncMock(return_value=score)
+        with mock.patch.object(views, "acheck", acheck), mock.patch.object(views, "query_log_writer"), \
+                mock.patch.object(views, "get_user_hash", mock.AsyncMock(return_value="user")):
+            return async_to_sync(views.perform_fake_news_check)(text, None), acheck
+
+    def test_near_copy_returns_the_stored_label_without_the_models(self):
+        (label, score, known), acheck = self.check(KNOWN_STORY.replace(" र ", ", र ") + "।")
+
+        acheck.assert_not_called()
+        self.assertEqual((label, score), ("Unauthentic", 0.0))
+        self.assertEqual(known["id"], self.story.id)
+        self.assertGreaterEqual(known["similarity"], 0.9)
+
+    def test_partial_match_below_min_similarity_goes_to_the_models(self):
+        # Every word is in the stored story, so it is a full-text candidate,
+        # but only about half of it.
+        partial = KNOWN_STORY[:len(KNOWN_STORY) // 2].rsplit(" ", 1)[0]
+        (label, score, known), acheck = self.check(partial)
+
+        acheck.assert_awaited_once_with(partial)
+        self.assertEqual((label, score, known), ("Likely Authentic", 80.0, None))
+
+        with override_settings(KNOWN_STORY_MIN_SIMILARITY=0.3):
+            (label, score, known), acheck = self.check(partial)
+        acheck.assert_not_called()
+        self.assertEqual(known["id"], self.story.id)
+
+
+class RebuildDecisionTests(SimpleTestCase):
+    def decide(self, state, incremental=True, mode="incremental"):
+        pp = mock.Mock(**{"supports_incremental.return_value": incremental})
+        with mock.patch.object(trainer, "TRAINING_MODE", mode):
+            return trainer.TrainModel().needs_full_rebuild(state, pp)
+
+    def test_updates_in_place_between_full_builds(self):
+        recent = {"last_full_build": datetime.now().isoformat(), "last_news_id": 10}
+        self.assertFalse(self.decide(recent))
+
+    def test_rebuilds_when_due_unrecorded_or_not_updatable(self):
+        recent = {"last_full_build": datetime.now().isoformat(), "last_news_id": 10}
+        stale = dict(recent, last_full_build=(datetime.now() - timedelta(days=trainer.FULL_REBUILD_DAYS)).isoformat())
+        self.assertTrue(self.decide(stale))
+        self.assertTrue(self.decide({}))
+        self.assertTrue(self.decide({"last_full_build": recent["last_full_build"]}))
+        self.assertTrue(self.decide(recent, incremental=False))
+        self.assertTrue(self.decide(recent, mode="full"))
+
+
+class FullRebuildTests(TestCase):
+    def test_installs_online_linear_models_in_incremental_mode(self):
+        for i, (text, label) in enumerate(zip(TRAINING_TEXTS, TRAINING_LABELS)):
+            News.objects.create(title=f"t{i}", description=text, source="s", isfake=not label)
+        News.objects.create(title="extra", description="अर्को सही खबर", source="s", isfake=False)
+        pp = make_predictor()
+        pp.fit = mock.Mock()
+
+        with mock.patch.object(trainer, "TRAINING_MODE", "incremental"), \
+                mock.patch.object(trainer.feature_cache, "ENABLED", False):
+            rows = trainer.TrainModel().fullRebuild(pp)
+
+        self.assertIsInstance(pp.LR, SGDClassifier)
+        self.assertEqual(pp.LR.loss, "log_loss")
+        self.assertIsInstance(pp.OC, SGDClassifier)
+        self.assertEqual(pp.OC.loss, "hinge")
+        self.assertIsInstance(pp.RF, RandomForestClassifier)
+        # Balanced: the extra real row is left out.
+        self.assertEqual(rows, 4)
+        self.assertEqual(sorted(pp.fit.call_args.args[0]["class"]), [0, 0, 1, 1])
+
+    def test_keeps_the_configured_models_in_full_mode(self):
+        pp = make_predictor()
+        pp.fit = mock.Mock()
+        with mock.patch.object(trainer, "TRAINING_MODE", "full"), \
+                mock.patch.object(trainer.feature_cache, "ENABLED", False):
+            trainer.TrainModel().fullRebuild(pp)
+        self.assertIsInstance(pp.LR, LogisticRegression)
+        self.assertIsInstance(pp.OC, LinearSVC)
+
+
+class FitIncrementalTests(SimpleTestCase):
+    def test_updates_linear_members_and_carries_over_the_trees(self):
+        pp = make_predictor(online=True)
+        rf, gb = pp.RF, pp.GB
+        lr_before = pp.LR.coef_.copy()
+        frame = pd.DataFrame({"text": ["सरकार नयाँ बजेट", "झुटो नक्कली खबर"], "class": [1, 0]})
+
+        with tempfile.TemporaryDirectory() as checkpoints, \
+                mock.patch.object(lstm_trainer, "CHECKPOINT_DIR", checkpoints):
+            pp.fit_incremental(frame, lstm_epochs=1, lstm_lr=1e-3)
+
+        self.assertIs(pp.RF, rf)
+        self.assertIs(pp.GB, gb)
+        self.assertFalse((pp.LR.coef_ == lr_before).all())
+        self.assertEqual(pp.training_metrics["RF"], {"carried_over": True})
+        self.assertEqual(pp.training_metrics["GB"], {"carried_over": True})
+        for name in ("LR", "OC"):
+            self.assertEqual(pp.training_metrics[name]["training_rows"], 2)
+        self.assertEqual(pp.training_report["mode"], "incremental")
+        self.assertEqual(sorted(pp.training_report["members"]), ["LR", "OC", "PT"])
+        self.assertEqual(pp.training_metrics["PT"]["epochs"], 1)
+
+
+WINDOWS = [[1, 2, 3], [4, 5], [2, 6, 7, 1], [3, 3]]
+
+
+def lstm_fixture(label):
+    torch.manual_seed(0)
+    return FakeNewsLSTM(8, 4, 4, 1, 1, False, 0.0), [(window, label) for window in WINDOWS]
+
+
+class CrashingTrainer(lstm_trainer.LSTMTrainer):
+    """Dies right after writing the checkpoint of ``crash_after`` epochs."""
+
+    crash_after = 2
+
+    def save_checkpoint(self, state):
+        super().save_checkpoint(state)
+        if state["epoch"] == self.crash_after:
+            raise RuntimeError("worker killed")
+
+
+class LSTMTrainerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(lstm_trainer, "CHECKPOINT_DIR", directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_stops_early_and_restores_the_best_weights(self):
+        # Validation labels the same windows the other way round, so every
+        # epoch after the first makes the validation loss worse.
+        model, train_set = lstm_fixture(1)
+        val_set = [(window, 0) for window, _ in train_set]
+        trainer_ = lstm_trainer.LSTMTrainer(lr=0.05, max_epochs=10, batch_size=2, patience=2)
+
+        model, metrics = trainer_.train(model, train_set, val_set)
+
+        self.assertTrue(metrics["stopped_early"])
+        self.assertEqual(metrics["epochs"], 3)
+        losses = [entry["val_loss"] for entry in metrics["history"]]
+        self.assertEqual(metrics["best_val_loss"], losses[0])
+        self.assertLess(losses[0], min(losses[1:]))
+        restored = trainer_.evaluate(model, trainer_.loader(val_set, shuffle=False), torch.nn.BCELoss())
+        self.assertAlmostEqual(restored, losses[0], places=4)
+
+    def test_resumes_an_interrupted_run_from_its_checkpoint(self):
+        model, train_set = lstm_fixture(1)
+        with self.assertRaisesRegex(RuntimeError, "worker killed"):
+            CrashingTrainer(lr=0.01, max_epochs=4, batch_size=2, patience=0, run="nightly").train(model, train_set)
+        checkpoint = os.path.join(lstm_trainer.CHECKPOINT_DIR, "nightly.pt")
+        self.assertTrue(os.path.exists(checkpoint))
+
+        model, train_set = lstm_fixture(1)
+        trainer_ = lstm_trainer.LSTMTrainer(lr=0.01, max_epochs=4, batch_size=2, patience=0, run="nightly")
+        _, metrics = trainer_.train(model, train_set)
+
+        self.assertEqual(metrics["resumed_from_epoch"], 2)
+        self.assertEqual([entry["epoch"] for entry in metrics["history"]], [1, 2, 3, 4])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_ignores_a_checkpoint_from_other_data(self):
+        model, train_set = lstm_fixture(1)
+        with self.assertRaises(RuntimeError):
+            CrashingTrainer(lr=0.01, max_epochs=4, batch_size=2, patience=0, run="nightly").train(model, train_set)
+
+        model, train_set = lstm_fixture(0)
+        trainer_ = lstm_trainer.LSTMTrainer(lr=0.01, max_epochs=4, batch_size=2, patience=0, run="nightly")
+        _, metrics = trainer_.train(model, train_set)
+
+        self.assertEqual(metrics["resumed_from_epoch"], 0)
+        self.assertEqual(metrics["epochs"], 4)
+
+
+TRANSLATION_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+    "translations": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "translations"},
+}
+
+
+class CountingBackend(LocalBackend):
+    """LocalBackend that detects Latin text as Hindi and counts its calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, text):
+        self.calls.append(("detect", text))
+        return "hi"
+
+    def translate(self, text, dest, src="auto"):
+        self.calls.append(("translate", text, dest))
+        return f"[{dest}] {text}"
+
+
+@override_settings(CACHES=TRANSLATION_CACHES)
+class TranslationServiceTests(SimpleTestCase):
+    def setUp(self):
+        caches["translations"].clear()
+
+    def test_local_backend_is_selected_by_settings(self):
+        with override_settings(TRANSLATION_BACKEND="local"):
+            service = get_translation_service()
+        self.assertIsInstance(service.backend, LocalBackend)
+        self.assertEqual(service.detect("नेपाल सरकार"), "ne")
+        self.assertEqual(service.detect("kya hua"), "en")
+        self.assertEqual(service.translate("kya hua", dest="ne"), "kya hua")
+
+    def test_detection_and_translation_are_cached(self):
+        backend = CountingBackend()
+        service = TranslationService(backend)
+        for _ in range(2):
+            self.assertEqual(service.detect("kya hua"), "hi")
+            self.assertEqual(service.translate("kya hua", dest="ne"), "[ne] kya hua")
+        self.assertEqual(service.detect("नेपाल सरकार"), "ne")
+        self.assertEqual(backend.calls, [("detect", "kya hua"), ("translate", "kya hua", "ne")])
+
+        # A fresh process-local LRU is served from the persistent cache.
+        other = TranslationService(backend)
+        self.assertEqual(asyncio.run(other.atranslate("kya hua", dest="ne")), "[ne] kya hua")
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_labels_are_pretranslated_or_translated_once(self):
+        backend = CountingBackend()
+        service = TranslationService(backend)
+        self.assertEqual(service.translate_label("Likely Authentic", "hi"), "संभवतः प्रामाणिक")
+        self.assertEqual(asyncio.run(service.atranslate_label("Authentic", "hi")), "प्रामाणिक")
+        self.assertEqual(service.translate_label("Authentic", "ne"), "Authentic")
+        self.assertEqual(service.translate_label("Authentic", "en"), "Authentic")
+        self.assertEqual(backend.calls, [])
+
+        for _ in range(2):
+            self.assertEqual(service.translate_label("Authentic", "fr"), "[fr] Authentic")
+        self.assertEqual(backend.calls, [("translate", "Authentic", "fr")])
+
+
+def score_length(text):
+    return float(len(text))
+
+
+@override_settings(TRANSLATION_BACKEND="local", CACHES=TRANSLATION_CACHES, BATCH_CHECK_CHUNK=2)
+class AsyncViewTests(SimpleTestCase):
+    """The async views with the models replaced by score_length and no
+    known stories."""
+
+    def setUp(self):
+        self.loop_threads = []
+        self.acheck = mock.AsyncMock(side_effect=score_length)
+        self.acheck_many = mock.AsyncMock(side_effect=lambda texts: [score_length(t) for t in texts])
+        for patcher in (
+            mock.patch.object(views, "acheck", self.acheck),
+            mock.patch.object(views, "acheck_many", self.acheck_many),
+            mock.patch.object(views, "find_known_story", return_value=None),
+            mock.patch.object(views, "purify", side_effect=self.purify),
+            mock.patch.object(views, "query_log_writer"),
+            mock.patch.object(views, "trigger_scraper_if_needed"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def purify(self, text):
+        try:
+            asyncio.get_running_loop()
+            self.loop_threads.append(threading.get_ident())
+        except RuntimeError:
+            pass
+        return text
+
+    async def test_search_result_page(self):
+        response = await self.async_client.get("/search_result", {"q": "सरकारको नयाँ निर्णय"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["percentage"], 19.0)
+        self.assertEqual(response.context["status"], "Likely Unauthentic")
+        self.acheck.assert_awaited_once_with("सरकारको नयाँ निर्णय")
+        self.assertEqual(self.loop_threads, [])
+
+    async def test_extension_check(self):
+        response = await self.async_client.post("/search_for_extension", {"content": "झुटो खबर"},
+                                                content_type="application/json")
+
+        self.assertEqual(response.json(), {
+            "authentic": "Unauthentic", "accuracy": 8.0, "searchfor": "झुटो खबर", "known_story": None,
+        })
+        self.assertEqual(self.loop_threads, [])
+
+    async def test_extension_check_reports_a_busy_checker(self):
+        self.acheck.side_effect = inference_service.InferenceError("queue full")
+        response = await self.async_client.post("/search_for_extension", {"content": "झुटो खबर"},
+                                                content_type="application/json")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {"status": False, "error": "queue full"})
+
+    async def test_batch_checks_each_distinct_text_once(self):
+        items = ["पहिलो", {"id": "b", "content": "दोस्रो खबर"}, "पहिलो", "तेस्रो समाचार"]
+        response = await self.async_client.post("/search_for_extension_batch", {"items": items},
+                                                content_type="application/json")
+
+        results = response.json()["results"]
+        self.assertEqual([r["index"] for r in results], [0, 1, 2, 3])
+        self.assertEqual([r["accuracy"] for r in results],
+                         [score_length(text if isinstance(text, str) else text["content"]) for text in items])
+        self.assertEqual(results[1]["id"], "b")
+        self.assertEqual([c.args[0] for c in self.acheck_many.await_args_list],
+                         [["पहिलो", "दोस्रो खबर"], ["तेस्रो समाचार"]])
+        self.assertEqual(self.loop_threads, [])
+
+    async def test_batch_streams_one_line_per_item_as_chunks_finish(self):
+        self.acheck_many.side_effect = [[5.0, 9.0], inference_service.InferenceError("queue full")]
+        items = ["पहिलो", "दोस्रो खबर", "पहिलो", "तेस्रो समाचार"]
+        response = await self.async_client.post("/search_for_extension_batch", {"items": items, "stream": True},
+                                                content_type="application/json")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        # The first chunk's items, duplicates included, come before the second's.
+        self.assertEqual([line["index"] for line in lines], [0, 2, 1, 3])
+        self.assertEqual([line.get("accuracy") for line in lines], [5.0, 5.0, 9.0, None])
+        self.assertEqual(lines[3], {"index": 3, "id": None, "status": False, "error": "queue full"})
+
+    async def test_batch_rejects_bad_requests(self):
+        response = await self.async_client.post("/search_for_extension_batch", {"items": []},
+                                                content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post("/search_for_extension_batch", "{",
+                                                content_type="application/json")
+        self.assertEqual(response.json(), {"status": False, "error": "Invalid JSON"})
+        self.acheck_many.assert_not_called()
 
-# Create your tests here.
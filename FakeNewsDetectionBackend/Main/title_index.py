@@ -0,0 +1,108 @@
+"""
+Near-duplicate title matching across news sources.
+
+Instead of running difflib on every title pair, titles are broken into
+character n-gram shingles and put into an inverted index. Only pairs that
+share at least ``min_shared`` shingles (ignoring shingles so common that
+their posting list exceeds ``max_posting``) become candidates, and only
+those are verified with the usual matchNews ratio. Any number of sources can
+be added; pairs within the same source are never compared.
+
+Titles with fewer than ``short_title`` shingles can reach the ratio without
+two shared shingles, so they are compared with every title of the other
+sources instead. For longer titles the filter does cost some recall: a pair
+whose common characters are scattered rather than in runs of ``n`` can pass
+matchNews and still never be a candidate. Headlines about the same story
+share whole words, so in practice those pairs are unrelated.
+"""
+from collections import Counter, defaultdict
+
+
+def shingles(title, n=3):
+    text = " ".join(title.lower().split())
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class TitleIndex:
+    def __init__(self, n=3, min_shared=2, max_posting=200, short_title=8):
+        self.n = n
+        self.min_shared = min_shared
+        self.max_posting = max_posting
+        self.short_title = short_title
+        self.entries = []  # (source, item)
+        self.postings = defaultdict(list)  # shingle -> [entry id]
+        self.candidates_checked = 0
+
+        self.short = set()  # entry ids of short titles
+
+    def add_source(self, source, items):
+        for item in items:
+            entry_id = len(self.entries)
+            self.entries.append((source, item))
+            title_shingles = shingles(item.title, self.n)
+            if len(title_shingles) < self.short_title:
+                self.short.add(entry_id)
+            for shingle in title_shingles:
+                self.postings[shingle].append(entry_id)
+
+    def candidate_pairs(self):
+        """Yield (a, b) entry ids from different sources, a < b, sharing
+        enough shingles, plus every pair with a short title."""
+        for a, (source, item) in enumerate(self.entries):
+            if a in self.short:
+                for b in range(len(self.entries)):
+                    if self.entries[b][0] != source and (b not in self.short or b > a):
+                        yield min(a, b), max(a, b)
+                continue
+            shared = Counter()
+            for shingle in shingles(item.title, self.n):
+                posting = self.postings[shingle]
+                if len(posting) > self.max_posting:
+                    continue
+                for b in posting:
+                    if b > a and b not in self.short and self.entries[b][0] != source:
+                        shared[b] += 1
+            for b, count in shared.items():
+                if count >= self.min_shared:
+                    yield a, b
+
+    def matching_pairs(self, threshold=0.5):
+        from .webscrapper import matchNews
+
+        self.candidates_checked = 0
+        for a, b in self.candidate_pairs():
+            self.candidates_checked += 1
+            if matchNews(self.entries[a][1].title, self.entries[b][1].title) >= threshold:
+                yield a, b
+
+    def corroborated(self, threshold=0.5, prefer=None):
+        """One item per story reported by at least two sources.
+
+        Matching titles are grouped transitively; each group is represented
+        by its first item from the ``prefer`` source, or its first item if
+        that source didn't report it. Items come in the order they were added.
+        """
+        parent = {}
+
+        def root(i):
+            while parent.get(i, i) != i:
+                i = parent[i]
+            return i
+
+        for a, b in self.matching_pairs(threshold):
+            parent.setdefault(a, a)
+            parent.setdefault(b, b)
+            ra, rb = root(a), root(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        groups = defaultdict(list)
+        for i in sorted(parent):
+            groups[root(i)].append(i)
+        chosen = []
+        for members in groups.values():
+            preferred = [i for i in members if self.entries[i][0] == prefer]
+            chosen.append((preferred or members)[0])
+        return [self.entries[i][1] for i in sorted(chosen)]
@@ -0,0 +1,191 @@
+"""
+Translation and language detection for the fake news check.
+
+Nepali input never leaves the process: the language is decided locally from
+the share of Devanagari letters, and only other languages go to the
+configured backend. Backend results are cached in a per-process LRU and in
+the persistent ``translations`` cache (see CACHES in settings), keyed by a
+hash of the text. English and Nepali requests get the labels as they are,
+Hindi ones a pretranslated table; any other language is translated once
+through the same caches.
+
+settings.TRANSLATION_BACKEND picks the backend: "google" (googletrans) or
+"local", an offline stub for tests and development that never translates.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+
+DEVANAGARI_RATIO = 0.5
+
+# Labels from views.CONFIGURATION. Nepali requests keep the English labels,
+# as they always have.
+UNTRANSLATED_LANGUAGES = ("en", "ne")
+# Devanagari Hindi is caught by the script check as "ne"; "hi" is what the
+# backend detects for Hindi typed in Latin script, the common case on phones.
+PRETRANSLATED_LABELS = {
+    "hi": {
+        "Unauthentic": "अप्रामाणिक",
+        "Likely Unauthentic": "संभवतः अप्रामाणिक",
+        "Possibly Unauthentic": "शायद अप्रामाणिक",
+        "Likely Authentic": "संभवतः प्रामाणिक",
+        "Authentic": "प्रामाणिक",
+    },
+}
+
+
+def is_nepali(text):
+    """True when at least DEVANAGARI_RATIO of the letters are Devanagari."""
+    devanagari = letters = 0
+    for ch in text:
+        if "\u0900" <= ch <= "\u097f":
+            devanagari += 1
+            letters += 1
+        elif ch.isalpha():
+            letters += 1
+    return letters > 0 and devanagari / letters >= DEVANAGARI_RATIO
+
+
+class LocalBackend:
+    """Offline backend: detects by script and returns text untranslated."""
+
+    def detect(self, text):
+        return "ne" if is_nepali(text) else "en"
+
+    def translate(self, text, dest, src="auto"):
+        return text
+
+
+class GoogleBackend:
+    def __init__(self):
+        self._local = threading.local()
+
+    def _translator(self):
+        # googletrans' Translator wraps an HTTP client that is not safe to
+        # share between threads, so keep one per thread.
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            from googletrans import Translator
+            translator = self._local.translator = Translator()
+        return translator
+
+    def detect(self, text):
+        return self._translator().detect(text).lang
+
+    def translate(self, text, dest, src="auto"):
+        return self._translator().translate(text, dest=dest, src=src).text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "local": LocalBackend,
+}
+
+
+class TranslationService:
+    def __init__(self, backend, cache_alias="translations", lru_size=2048):
+        self.backend = backend
+        self.cache_alias = cache_alias
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _persistent(self):
+        try:
+            return caches[self.cache_alias]
+        except InvalidCacheBackendError:
+            return None
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+
+        persistent = self._persistent()
+        value = persistent.get(key) if persistent is not None else None
+        if value is None:
+            value = compute()
+            if persistent is not None:
+                persistent.set(key, value, None)
+
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return value
+
+    def _peek(self, key):
+        with self._lock:
+            return self._lru.get(key)
+
+    @staticmethod
+    def _key(*parts):
+        return "tr:" + hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def detect(self, text):
+        if is_nepali(text):
+            return "ne"
+        return self._cached(self._key("detect", text), lambda: self.backend.detect(text))
+
+    def translate(self, text, dest, src="auto"):
+        if src == dest:
+            return text
+        return self._cached(self._key("translate", src, dest, text),
+                            lambda: self.backend.translate(text, dest=dest, src=src))
+
+    def translate_label(self, label, lang):
+        if lang in UNTRANSLATED_LANGUAGES:
+            return label
+        pretranslated = PRETRANSLATED_LABELS.get(lang, {}).get(label)
+        if pretranslated is not None:
+            return pretranslated
+        return self.translate(label, dest=lang, src="en")
+
+    # Async variants for async views: answered inline when the script, the
+    # pretranslated labels or the LRU decide, otherwise the blocking backend
+    # call (and persistent cache) runs in a worker thread.
+
+    async def adetect(self, text):
+        if is_nepali(text):
+            return "ne"
+        cached = self._peek(self._key("detect", text))
+        if cached is not None:
+            return cached
+        return await sync_to_async(self.detect, thread_sensitive=False)(text)
+
+    async def atranslate(self, text, dest, src="auto"):
+        if src == dest:
+            return text
+        cached = self._peek(self._key("translate", src, dest, text))
+        if cached is not None:
+            return cached
+        return await sync_to_async(self.translate, thread_sensitive=False)(text, dest, src)
+
+    async def atranslate_label(self, label, lang):
+        if lang in UNTRANSLATED_LANGUAGES:
+            return label
+        pretranslated = PRETRANSLATED_LABELS.get(lang, {}).get(label)
+        if pretranslated is not None:
+            return pretranslated
+        return await self.atranslate(label, dest=lang, src="en")
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_translation_service():
+    name = getattr(settings, "TRANSLATION_BACKEND", "google")
+    service = _services.get(name)
+    if service is None:
+        with _services_lock:
+            service = _services.get(name)
+            if service is None:
+                service = _services[name] = TranslationService(BACKENDS[name]())
+    return service
@@ -1,18 +1,22 @@
-import threading
+import asyncio
 import json
 import hashlib
-from datetime import datetime
 from django.shortcuts import render, HttpResponse
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
-from googletrans import Translator
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from asgiref.sync import sync_to_async
 
 from django.views.decorators.csrf import csrf_exempt
-from .models import Feedback, ReportIssue, TodaysNews, News, UserQueryLog
-from .webscrapper import WebScrapper
-from .TrainingModel.AuthenticityChecker import AuthenticityChecker, Prediction
-from .TrainingModel.trainer import TrainModel
+from .models import Feedback, ReportIssue
+from .scheduler import scheduler
+from .translation import get_translation_service
+from .querylog import query_log_writer
+from .known_stories import find_known_story
+from .inference_service import InferenceError, acheck, acheck_many, get_checker
+from .TrainingModel.normalizer import purify
+from .TrainingModel.result_cache import get_result_cache
 
 CONFIGURATION = {
     "10": "Unauthentic",
@@ -22,8 +26,6 @@ CONFIGURATION = {
     "100": "Authentic"
 }
 
-SCRAPER_LOCK = threading.Lock()
-
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -32,102 +34,119 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
-def _background_scraper_task():
-    if not SCRAPER_LOCK.acquire(blocking=False):
-        return
-
-    try:
-        today = datetime.today().date()
-        if TodaysNews.objects.filter(date=today).exists():
-            return
-
-        print("Scraper started")
-        TodaysNews.objects.create()
-        
-        scrapper = WebScrapper()
-        predictor = Prediction()
-        
-        fake_news_sample = News.objects.filter(isfake=True).order_by('?').first()
-        fake_desc = fake_news_sample.description if fake_news_sample else "Fake news placeholder"
-
-        for item in scrapper.lists:
-            if not News.objects.filter(title=item.title).exists():
-                News.objects.create(
-                    title=item.title,
-                    description=predictor.getPurified(item.description),
-                    source=item.source,
-                    isfake=False,
-                    meta_data={"original_url": item.source, "scraped_at": str(timezone.now())}
-                )
-                
-                News.objects.create(
-                    title="Fake: " + item.title,
-                    description=fake_desc,
-                    source="Generated-Fake",
-                    isfake=True
-                )
-        
-        TrainModel().trainModel()
-        print("Model Trained")
+def trigger_scraper_if_needed():
+    scheduler.trigger_if_due()
 
-    except Exception as e:
-        print(f"Error in background scraper: {e}")
-    finally:
-        SCRAPER_LOCK.release()
+def score_label(score):
+    label = "Unauthentic"
+    prev_threshold = 0
+    for threshold, val in CONFIGURATION.items():
+        if score < int(threshold) and score >= prev_threshold:
+            label = val
+            break
+        prev_threshold = int(threshold)
+    return label
 
-def trigger_scraper_if_needed():
-    today = datetime.today().date()
-    if not TodaysNews.objects.filter(date=today).exists():
-        t = threading.Thread(target=_background_scraper_task, daemon=True)
-        t.start()
+def known_story_result(known):
+    if known["isfake"]:
+        return 0.0, "Unauthentic"
+    return 100.0, "Authentic"
 
-def perform_fake_news_check(query_text, request_obj):
-    translator = Translator()
+async def prepare_input(translator, query_text):
+    """(source language, Nepali text for the models) for one query."""
     try:
-        lang_detect = translator.detect(query_text)
-        source_lang = lang_detect.lang
+        source_lang = await translator.adetect(query_text)
         
         if source_lang != 'ne':
-            translated_text = translator.translate(query_text, dest="ne").text
-            input_for_model = translated_text
+            input_for_model = await translator.atranslate(query_text, dest="ne")
         else:
-            translated_text = query_text
             input_for_model = query_text
     except Exception:
         source_lang = 'ne'
         input_for_model = query_text
+    return source_lang, input_for_model
 
-    score = AuthenticityChecker().check(input_for_model)
-
-    label = "Unauthentic"
-    prev_threshold = 0
-    for threshold, val in CONFIGURATION.items():
-        if score < int(threshold) and score >= prev_threshold:
-            label = val
-            break
-        prev_threshold = int(threshold)
+async def localized_label(translator, label, lang):
+    try:
+        return await translator.atranslate_label(label, lang)
+    except Exception:
+        return label
 
-    if request_obj.user.is_authenticated:
-        user_identifier = str(request_obj.user.id)
+async def get_user_hash(request_obj):
+    user = await request_obj.auser()
+    if user.is_authenticated:
+        user_identifier = str(user.id)
     else:
         user_identifier = request_obj.session.session_key or get_client_ip(request_obj)
 
-    hashed_id = hashlib.sha256(str(user_identifier).encode()).hexdigest()
+    return hashlib.sha256(str(user_identifier).encode()).hexdigest()
 
-    UserQueryLog.objects.create(
+def log_check(hashed_id, query_text, score, label, input_for_model, source_lang, known):
+    # Only queues the record; the writer thread does the INSERT.
+    query_log_writer.log(
         user_hash=hashed_id,
         query_text=query_text,
         prediction_score=score,
         prediction_label=label,
-        explainability_data={"input_length": len(input_for_model), "lang": source_lang}
+        explainability_data={
+            "input_length": len(input_for_model),
+            "lang": source_lang,
+            "known_story": known and known["id"],
+        }
     )
 
-    if source_lang != 'ne':
-        final_status = translator.translate(label, dest=source_lang).text
+async def perform_fake_news_check(query_text, request_obj):
+    # Async so the worker is free while translation, the corpus lookup and
+    # inference are in flight; each blocking step runs off the event loop.
+    translator = get_translation_service()
+    source_lang, input_for_model = await prepare_input(translator, query_text)
+
+    # Stories already in the corpus keep their stored label; the models only
+    # see text that isn't a near-copy of a known article.
+    known = await sync_to_async(lookup_known_story)(input_for_model)
+    if known is not None:
+        score, label = known_story_result(known)
     else:
-        final_status = label
+        # In-process models, or the inference service when one is configured.
+        score = await acheck(input_for_model)
+        label = score_label(score)
+
+    log_check(await get_user_hash(request_obj), query_text, score, label, input_for_model, source_lang, known)
+
+    final_status = await localized_label(translator, label, source_lang)
+    return final_status, score, known
+
+def lookup_known_story(text):
+    # purify() loads the stemmer dictionaries on first use, so it runs off
+    # the event loop together with the query.
+    return find_known_story(text, purify(text))
+
+def find_known_stories(texts):
+    return [lookup_known_story(text) for text in texts]
+
+async def check_texts(texts, hashed_id):
+    """perform_fake_news_check for several distinct texts: translations run
+    concurrently and every text that isn't a known story goes through one
+    batched model run. Returns (final_status, score, known) per text."""
+    translator = get_translation_service()
+    prepared = await asyncio.gather(*(prepare_input(translator, text) for text in texts))
+    inputs = [input_for_model for _, input_for_model in prepared]
 
-    return final_status, score
+    known = await sync_to_async(find_known_stories)(inputs)
+    unknown = [i for i, story in enumerate(known) if story is None]
+    scores = dict(zip(unknown, await acheck_many([inputs[i] for i in unknown])))
+
+    results = []
+    for i, text in enumerate(texts):
+        source_lang = prepared[i][0]
+        if known[i] is not None:
+            score, label = known_story_result(known[i])
+        else:
+            score = scores[i]
+            label = score_label(score)
+        log_check(hashed_id, text, score, label, inputs[i], source_lang, known[i])
+        results.append((await localized_label(translator, label, source_lang), score, known[i]))
+    return results
 
 def MainPage(request):
     trigger_scraper_if_needed()
@@ -137,24 +156,29 @@ def MainPage(request):
 def Download(request):
     return render(request, "download.html")
 
-def ResultPage(request):
+async def ResultPage(request):
     trigger_scraper_if_needed()
     
     query = request.GET.get("q")
     if not query:
         return render(request, "searchreasult.html")
 
-    status_text, percentage = perform_fake_news_check(query, request)
+    try:
+        status_text, percentage, known = await perform_fake_news_check(query, request)
+    except InferenceError as e:
+        print(f"Inference failed: {e}")
+        return HttpResponse("The checker is busy right now, please try again shortly.", status=503)
 
     context = {
         "status": status_text,
         "searchfor": query, 
-        "percentage": percentage
+        "percentage": percentage,
+        "known_story": known,
     }
     return render(request, "searchreasult.html", context)
 
 @csrf_exempt
-def ResultForExtension(request):
+async def ResultForExtension(request):
     if request.method == "POST":
         try:
             if request.content_type == 'application/json':
@@ -166,18 +190,124 @@ def ResultForExtension(request):
             if not query:
                 return JsonResponse({"status": False, "error": "No content provided"})
 
-            status_text, percentage = perform_fake_news_check(query, request)
+            status_text, percentage, known = await perform_fake_news_check(query, request)
 
             return JsonResponse({
                 "authentic": status_text,
                 "accuracy": percentage,
-                "searchfor": query
+                "searchfor": query,
+                "known_story": known,
             })
+        except InferenceError as e:
+            return JsonResponse({"status": False, "error": str(e)}, status=503)
         except Exception as e:
             return JsonResponse({"status": False, "error": str(e)})
 
     return JsonResponse({"status": False})
 
+class BatchRequestError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def parse_batch_items(data):
+    """[(client id, content), ...] from {"items": [...]}, where each item is
+    a string or {"id": ..., "content": ...}."""
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BatchRequestError("No items provided")
+    if len(items) > settings.BATCH_CHECK_MAX_ITEMS:
+        raise BatchRequestError(f"At most {settings.BATCH_CHECK_MAX_ITEMS} items per request", status=413)
+
+    parsed = []
+    for index, item in enumerate(items):
+        client_id, content = None, item
+        if isinstance(item, dict):
+            client_id, content = item.get("id"), item.get("content")
+        if not isinstance(content, str) or not content.strip():
+            raise BatchRequestError(f"Item {index} has no content")
+        if len(content) > settings.BATCH_CHECK_MAX_CHARS:
+            raise BatchRequestError(f"Item {index} is longer than {settings.BATCH_CHECK_MAX_CHARS} characters", status=413)
+        parsed.append((client_id, content))
+    return parsed
+
+def batch_item_result(index, client_id, result):
+    if isinstance(result, Exception):
+        return {"index": index, "id": client_id, "status": False, "error": str(result)}
+    status_text, percentage, known = result
+    return {
+        "index": index,
+        "id": client_id,
+        "authentic": status_text,
+        "accuracy": percentage,
+        "known_story": known,
+    }
+
+@csrf_exempt
+async def ResultForExtensionBatch(request):
+    """Check many texts in one request.
+
+    Identical texts are checked once. Unique texts are processed in chunks
+    of BATCH_CHECK_CHUNK; with "stream": true each item's result is sent as
+    one NDJSON line as soon as its chunk is done, otherwise all results come
+    back together, in request order.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": False}, status=405)
+    if int(request.META.get("CONTENT_LENGTH") or 0) > settings.BATCH_CHECK_MAX_BYTES:
+        return JsonResponse({"status": False, "error": "Request too large"}, status=413)
+    try:
+        data = json.loads(request.body)
+        items = parse_batch_items(data)
+    except BatchRequestError as e:
+        return JsonResponse({"status": False, "error": str(e)}, status=e.status)
+    except ValueError:
+        return JsonResponse({"status": False, "error": "Invalid JSON"}, status=400)
+
+    positions = {}
+    for index, (_, content) in enumerate(items):
+        positions.setdefault(content, []).append(index)
+    unique = list(positions)
+    hashed_id = await get_user_hash(request)
+    chunk_size = settings.BATCH_CHECK_CHUNK
+
+    async def results():
+        for start in range(0, len(unique), chunk_size):
+            texts = unique[start:start + chunk_size]
+            try:
+                checked = await check_texts(texts, hashed_id)
+            except InferenceError as e:
+                checked = [e] * len(texts)
+            for text, result in zip(texts, checked):
+                for index in positions[text]:
+                    yield batch_item_result(index, items[index][0], result)
+
+    if data.get("stream"):
+        async def lines():
+            async for result in results():
+                yield json.dumps(result) + "\n"
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+    collected = [result async for result in results()]
+    collected.sort(key=lambda result: result["index"])
+    return JsonResponse({"status": True, "results": collected})
+
+@staff_member_required
+def ModelStatus(request):
+    status = {"query_log": query_log_writer.stats()}
+    if settings.INFERENCE_SERVICE_SOCKET:
+        try:
+            status["inference_service"] = get_checker().stats()
+        except InferenceError as e:
+            status["inference_service"] = {"error": str(e)}
+    else:
+        # Models live in this process; imported here so web workers that use
+        # the inference service never load torch.
+        from .TrainingModel.registry import registry
+        status.update(registry.stats())
+        status["result_cache"] = get_result_cache().stats()
+    return JsonResponse(status)
+
 def GetReviews(request):
     feedbacks = Feedback.objects.select_related('user').all()
     data = []
@@ -7,6 +7,9 @@ from bs4 import BeautifulSoup, Tag
 from typing import List
 import difflib
 
+from .scraper_engine import AnnapurnaSource, KantipurSource, scrape
+from .title_index import TitleIndex
+
 def matchNews(a, b):
     # Uses SequenceMatcher to determine similarity ratio between two titles
     seq = difflib.SequenceMatcher()
@@ -24,6 +27,7 @@ MAx_LIMIT_TODAY_DATA = 30
 class Kantipur:
     lists: List[Data] = []
     def __init__(self, url="https://ekantipur.com/news"):
+        self.lists = []
         print("\n[Kantipur] --- Starting Scraper ---")
         
         # Configure Headless Chrome for server environments
@@ -107,6 +111,7 @@ class Kantipur:
 class Annapurna:
     lists: List[Data] = []
     def __init__(self, url="https://www.annapurnapost.com/"):
+        self.lists = []
         print("\n[Annapurna] --- Starting Scraper ---")
         
         # Configure Headless Chrome
@@ -178,29 +183,24 @@ class Annapurna:
 
 class WebScrapper:
     lists: list[Data] = []
-    def __init__(self) -> None:
+    def __init__(self, sources=None, selenium_fallback=True) -> None:
+        self.lists = []
         print("\n[System] --- Initializing Aggregator ---")
         
-        # Initialize individual scrapers
-        annapurnapost = Annapurna()
-        kantipurpost = Kantipur()
-        
+        # Fetch all sources concurrently over HTTP; Selenium only steps in for
+        # a source whose static pages turn out to be empty.
+        if sources is None:
+            sources = [AnnapurnaSource(limit=MAx_LIMIT_TODAY_DATA), KantipurSource(limit=MAx_LIMIT_TODAY_DATA)]
+        collected = scrape(sources, selenium_fallback=selenium_fallback)
         print(f"[System] Starting Cross-Validation (Threshold: 0.5)...")
-        print(f"[System] Kantipur Corpus: {len(kantipurpost.lists)} | Annapurna Corpus: {len(annapurnapost.lists)}")
+        print("[System] " + " | ".join(f"{name} Corpus: {len(items)}" for name, items in collected.items()))
         
-        # Cross-reference articles to find common news stories
-        # Pass 1: Kantipur -> Annapurna
-        for data in kantipurpost.lists:
-            for anna in annapurnapost.lists:
-                if matchNews(anna.title, data.title) >= 0.5:
-                    self.lists.append(data)
-                    break
-        
-        # Pass 2: Annapurna -> Kantipur
-        for data in kantipurpost.lists: 
-            for anna in annapurnapost.lists:
-                if matchNews(anna.title, data.title) >= 0.5:
-                    self.lists.append(data)
-                    break
+        # Keep the stories reported by at least two sources, once each, in
+        # Kantipur's wording when it has the story. Candidate pairs come from
+        # a shingle index, so only similar titles reach matchNews.
+        index = TitleIndex()
+        for name, items in collected.items():
+            index.add_source(name, items)
+        self.lists = index.corroborated(threshold=0.5, prefer="Kantipur")
                     
-        print(f"[System] Aggregation Complete. Total Verified Articles: {len(self.lists)}")
\ No newline at end of file
+        print(f"[System] Aggregation Complete. Compared {index.candidates_checked} candidate pairs. Total Verified Articles: {len(self.lists)}")
@@ -0,0 +1,105 @@
+"""
+Latency/accuracy comparison of the FakeNewsLSTM inference variants.
+
+Run from FakeNewsDetectionBackend/:
+
+    python benchmarks/lstm_inference_benchmark.py [--limit N] [--labels data.csv]
+
+Variants: the legacy call (training mode, autograd on), eval +
+inference_mode, int8 dynamic quantization, and the TorchScript export.
+Scores are compared against the eval fp32 reference; with ``--labels`` (a
+CSV with "text" and "class" columns) accuracy against the labels is also
+reported.
+"""
+import argparse
+import csv
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+
+import torch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from Main.TrainingModel.Prediction import Prediction  # noqa: E402
+from Main.TrainingModel.stemmer import MODEL_DIR  # noqa: E402
+from Main.TrainingModel.inference import export_torchscript, prepare_for_inference  # noqa: E402
+from stem_benchmark import load_texts  # noqa: E402
+
+
+def load_labelled(path):
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            texts.append(row["text"])
+            labels.append(int(row["class"]))
+    return texts, labels
+
+
+def run(model, inputs, legacy=False):
+    """Score one document at a time, like the request path does."""
+    latencies, scores = [], []
+    for i in range(inputs.shape[0]):
+        row = inputs[i:i + 1]
+        started = time.perf_counter()
+        if legacy:
+            out = model(row)
+        else:
+            with torch.inference_mode():
+                out = model(row)
+        latencies.append(time.perf_counter() - started)
+        scores.append(float(out.reshape(-1)[0]))
+    return latencies, scores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--labels", help="CSV with text/class columns")
+    args = parser.parse_args()
+
+    with open(os.path.join(MODEL_DIR, "PT.pkl"), "rb") as f:
+        pickled = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, "vocab.pkl"), "rb") as f:
+        vocab = pickle.load(f)
+
+    if args.labels:
+        texts, labels = load_labelled(args.labels)
+    else:
+        texts, labels = load_texts(), None
+    texts = texts[:args.limit]
+    labels = labels[:args.limit] if labels else None
+
+    pp = Prediction()
+    texts = [pp.stem(pp.removeCharacters(t)) for t in texts]
+    inputs = torch.tensor(pp.pad_sequences(pp.preprocess_texts(texts, vocab), 100))
+
+    variants = {}
+    legacy = pickle.loads(pickle.dumps(pickled))
+    legacy.train()
+    variants["legacy"] = run(legacy, inputs, legacy=True)
+    variants["eval"] = run(prepare_for_inference(pickle.loads(pickle.dumps(pickled))), inputs)
+    variants["int8"] = run(prepare_for_inference(pickle.loads(pickle.dumps(pickled)), quantize=True), inputs)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = export_torchscript(pickle.loads(pickle.dumps(pickled)), os.path.join(tmp, "PT.ts"))
+        variants["torchscript"] = run(torch.jit.load(path), inputs)
+
+    reference = variants["eval"][1]
+    print(f"{len(texts)} documents, batch size 1")
+    print(f"{'variant':<12}{'p50 ms':>10}{'p95 ms':>10}{'max |d|':>10}{'agree':>8}{'acc':>8}")
+    for name, (latencies, scores) in variants.items():
+        latencies = sorted(latencies)
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        diff = max(abs(a - b) for a, b in zip(scores, reference))
+        agree = sum((a >= 0.5) == (b >= 0.5) for a, b in zip(scores, reference)) / len(scores)
+        acc = f"{sum((s >= 0.5) == bool(l) for s, l in zip(scores, labels)) / len(scores):.3f}" if labels else "-"
+        print(f"{name:<12}{p50:>10.2f}{p95:>10.2f}{diff:>10.4f}{agree:>8.3f}{acc:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Tokens/sec of Prediction.stem before and after the set/trie stemmer.
+
+Run from FakeNewsDetectionBackend/:
+
+    python benchmarks/stem_benchmark.py [--limit N]
+
+Texts come from the CSVs in fake-news-detection-model-prerequisites. The
+legacy implementation is reproduced verbatim (list lookup and a regex
+alternation built per token) and every output is checked for parity.
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from Main.TrainingModel.stemmer import MODEL_DIR, Stemmer, read_lines  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(BASE_DIR), "fake-news-detection-model-prerequisites")
+
+
+class LegacyStemmer:
+    def __init__(self, words, suf):
+        self.words = words
+        self.suf = suf
+
+    def stem(self, text):
+        if text in self.suf:
+            return text
+
+        w = []
+        for t in text.split(" "):
+            if t not in self.words:
+                pattern = r'(\s*)(' + '|'.join(map(re.escape, self.suf)) + r')$'
+                modified_text = re.sub(pattern, r' \2', t)
+                if len(modified_text.split(" "))>1:
+                    modified_text = self.stem(modified_text.split(" ")[0]) + " " + modified_text.split(" ")[1]
+                w.append(modified_text)
+            else:
+                w.append(t)
+
+        modified_text = " ".join(w)
+
+        return modified_text
+
+
+def load_texts():
+    csv.field_size_limit(sys.maxsize)
+    texts = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.csv"))):
+        with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                texts.extend(cell for cell in row if cell and not cell.startswith("http"))
+    return texts
+
+
+def run(stemmer, texts):
+    started = time.perf_counter()
+    out = [stemmer.stem(t) for t in texts]
+    return out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=2000,
+                        help="number of texts to run through the (slow) legacy stemmer")
+    args = parser.parse_args()
+
+    words = read_lines(os.path.join(MODEL_DIR, "dict.txt"))
+    suf = read_lines(os.path.join(MODEL_DIR, "suf.txt"))
+    texts = load_texts()
+    sample = texts[:args.limit]
+    tokens_all = sum(len(t.split(" ")) for t in texts)
+    tokens_sample = sum(len(t.split(" ")) for t in sample)
+
+    legacy_out, legacy_time = run(LegacyStemmer(words, suf), sample)
+    new = Stemmer(words, suf)
+    new_out, _ = run(new, sample)
+    mismatches = sum(a != b for a, b in zip(legacy_out, new_out))
+    _, new_time = run(new, texts)
+
+    print(f"texts: {len(texts)} ({tokens_all} tokens), legacy sample: {len(sample)} ({tokens_sample} tokens)")
+    print(f"legacy : {tokens_sample / legacy_time:12.0f} tokens/sec")
+    print(f"trie   : {tokens_all / new_time:12.0f} tokens/sec")
+    print(f"speedup: {(tokens_all / new_time) / (tokens_sample / legacy_time):.1f}x, mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
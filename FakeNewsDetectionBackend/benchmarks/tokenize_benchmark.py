@@ -0,0 +1,81 @@
+"""
+Per-request tokenization: separate TF-IDF and LSTM passes vs the shared
+tokenize_document() pass.
+
+Run from FakeNewsDetectionBackend/:
+
+    python benchmarks/tokenize_benchmark.py [--limit N]
+
+Texts come from the CSVs in fake-news-detection-model-prerequisites and are
+normalized the way Prediction.normalize does. The legacy path runs the
+fitted vect.pkl analyzer and clean_text_ + RegexpTokenizer per text; the
+shared path produces both from one pass. Every text's terms and tokens, and
+the whole TF-IDF matrix, are checked for parity.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from nltk.tokenize import RegexpTokenizer  # noqa: E402
+
+from Main.TrainingModel.feature_cache import transform_tokens  # noqa: E402
+from Main.TrainingModel.normalizer import (  # noqa: E402
+    analyze_word, clean_devanagari, remove_characters, shared_analysis, tokenize_document)
+from Main.TrainingModel.stemmer import MODEL_DIR, default_stemmer  # noqa: E402
+from stem_benchmark import load_texts  # noqa: E402
+
+
+def legacy(vect, texts):
+    analyzer = vect.build_analyzer()
+    tokenizer = RegexpTokenizer(r'[\u0900-\u097F]+')
+    started = time.perf_counter()
+    out = [(analyzer(t), tokenizer.tokenize(clean_devanagari(t))) for t in texts]
+    return out, time.perf_counter() - started
+
+
+def shared(texts):
+    started = time.perf_counter()
+    out = [tokenize_document(t) for t in texts]
+    return out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N texts")
+    args = parser.parse_args()
+
+    with open(os.path.join(MODEL_DIR, "vect.pkl"), "rb") as f:
+        vect = pickle.load(f)
+    if not shared_analysis(vect):
+        print("vect.pkl has a custom analyzer; Prediction keeps tokenizing each branch separately")
+        return 1
+
+    stemmer = default_stemmer()
+    texts = load_texts()
+    if args.limit:
+        texts = texts[:args.limit]
+    texts = [stemmer.stem(remove_characters(t)) for t in texts]
+
+    legacy_out, legacy_time = legacy(vect, texts)
+    analyze_word.cache_clear()
+    shared_out, cold_time = shared(texts)
+    _, warm_time = shared(texts)
+
+    mismatches = sum(list(a[0]) != list(b[0]) or list(a[1]) != list(b[1]) for a, b in zip(legacy_out, shared_out))
+    matrix_diff = abs(vect.transform(texts) - transform_tokens(vect, [terms for terms, _ in shared_out])).max()
+
+    print(f"texts: {len(texts)}, distinct words cached: {analyze_word.cache_info().currsize}")
+    print(f"legacy (two passes) : {len(texts) / legacy_time:10.0f} texts/sec")
+    print(f"shared (cold cache) : {len(texts) / cold_time:10.0f} texts/sec")
+    print(f"shared (warm cache) : {len(texts) / warm_time:10.0f} texts/sec")
+    print(f"mismatches: {mismatches}, max |TF-IDF difference|: {matrix_diff}")
+    return 1 if mismatches or matrix_diff else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
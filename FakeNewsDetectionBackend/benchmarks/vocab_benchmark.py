@@ -0,0 +1,102 @@
+"""
+LSTM input preparation: dict.get lists + torch.tensor vs VocabIndex +
+pad_batch (NumPy buffers wrapped with torch.from_numpy).
+
+Run from FakeNewsDetectionBackend/:
+
+    python benchmarks/vocab_benchmark.py [--limit N] [--repeat R] [--min-tokens T]
+
+Texts come from the CSVs in fake-news-detection-model-prerequisites,
+normalized and tokenized the way Prediction does, and are encoded with
+vocab.pkl. Both a single request (one text at a time) and the whole corpus
+as one batch are timed, padded to the longest text capped at 100 tokens like
+one LSTM window. A pandas Index lookup is timed as well, for reference. The
+padded ids and lengths are checked for parity.
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import pandas as pd
+import torch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from Main.TrainingModel.normalizer import remove_characters, tokenize_document  # noqa: E402
+from Main.TrainingModel.stemmer import MODEL_DIR, default_stemmer  # noqa: E402
+from Main.TrainingModel.vocab import VocabIndex, pad_batch  # noqa: E402
+from stem_benchmark import load_texts  # noqa: E402
+
+WIDTH = 100
+
+
+def legacy(vocab, tokenized_texts):
+    sequences = [[vocab.get(token, vocab["<UNK>"]) for token in tokens][:WIDTH] for tokens in tokenized_texts]
+    lengths = [max(len(seq), 1) for seq in sequences]
+    width = max(lengths)
+    padded = [seq + [0] * (width - len(seq)) for seq in sequences]
+    return torch.tensor(padded), torch.tensor(lengths)
+
+
+def numpy_backed(index, tokenized_texts):
+    return pad_batch(index.encode_many(tokenized_texts))
+
+
+def timed(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N texts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-tokens", type=int, default=0, help="skip texts with fewer tokens (e.g. titles)")
+    args = parser.parse_args()
+
+    with open(os.path.join(MODEL_DIR, "vocab.pkl"), "rb") as f:
+        vocab = pickle.load(f)
+    stemmer = default_stemmer()
+    texts = load_texts()
+    if args.limit:
+        texts = texts[:args.limit]
+    tokenized = [tokenize_document(stemmer.stem(remove_characters(t)))[1] for t in texts]
+    windows = [tokens[:WIDTH] for tokens in tokenized if len(tokens) >= args.min_tokens]
+    index = VocabIndex(vocab)
+
+    (old_ids, old_lengths), old_batch = timed(legacy, vocab, windows, repeat=args.repeat)
+    (new_ids, new_lengths), new_batch = timed(numpy_backed, index, windows, repeat=args.repeat)
+    parity = torch.equal(old_ids, new_ids) and torch.equal(old_lengths, new_lengths)
+
+    def one_at_a_time(fn, lookup):
+        for tokens in windows:
+            fn(lookup, [tokens])
+
+    _, old_single = timed(one_at_a_time, legacy, vocab, repeat=args.repeat)
+    _, new_single = timed(one_at_a_time, numpy_backed, index, repeat=args.repeat)
+
+    flat = [token for tokens in windows for token in tokens]
+    pandas_index = pd.Index(list(vocab), dtype=object)
+    _, dict_lookup = timed(index.encode, flat, repeat=args.repeat)
+    _, pandas_lookup = timed(pandas_index.get_indexer, flat, repeat=args.repeat)
+
+    tokens = len(flat)
+    print(f"texts: {len(windows)}, tokens: {tokens}, padded batch: {tuple(new_ids.shape)}")
+    print(f"{'':<24}{'legacy':>12}{'numpy':>12}")
+    print(f"{'batch (ms)':<24}{old_batch * 1000:>12.1f}{new_batch * 1000:>12.1f}")
+    print(f"{'per request (us)':<24}{old_single / len(windows) * 1e6:>12.1f}{new_single / len(windows) * 1e6:>12.1f}")
+    print(f"lookup only: dict {tokens / dict_lookup:,.0f} tokens/sec, pandas Index {tokens / pandas_lookup:,.0f} tokens/sec")
+    print(f"parity: {parity}")
+    return 0 if parity else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())